@@ -0,0 +1,252 @@
+"""Fault injection for the database engine and a local fake Discord REST API.
+
+Nothing here is imported by the bot; manage.py chaos wires it around an
+interaction replay (benchmarks/replay.py).
+"""
+import asyncio
+import json
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from sqlalchemy import event
+from sqlalchemy.util import await_only
+
+DROP_MESSAGE = "connection dropped (fault injection)"
+
+@dataclass
+class FaultProfile:
+    db_latency_ms: float = 0.0
+    db_jitter_ms: float = 0.0
+    db_spike_rate: float = 0.0  # share of statements that stall for db_spike_ms
+    db_spike_ms: float = 0.0
+    db_drop_rate: float = 0.0  # share of statements whose connection is cut
+    discord_latency_ms: float = 0.0
+    discord_429_rate: float = 0.0
+    discord_5xx_rate: float = 0.0
+    retry_after_s: float = 1.0
+    seed: int = None
+
+class FaultInjector:
+    """Draws faults from a profile and counts what it injected"""
+
+    def __init__(self, profile: FaultProfile):
+        self.profile = profile
+        self.random = random.Random(profile.seed)
+        self.counts = Counter()
+        self.db_hooks = []
+
+    def db_delay(self) -> float:
+        p = self.profile
+        delay = p.db_latency_ms + self.random.uniform(-p.db_jitter_ms, p.db_jitter_ms)
+        if p.db_spike_rate and self.random.random() < p.db_spike_rate:
+            self.counts["db_spikes"] += 1
+            delay += p.db_spike_ms
+        return max(0.0, delay) / 1000
+
+    def db_drop(self) -> bool:
+        return bool(self.profile.db_drop_rate) and self.random.random() < self.profile.db_drop_rate
+
+    def discord_status(self) -> int:
+        roll = self.random.random()
+        if roll < self.profile.discord_429_rate:
+            return 429
+        if roll < self.profile.discord_429_rate + self.profile.discord_5xx_rate:
+            # discord.py retries 500, 502, 504 and 524 but gives up on 503 at once
+            return self.random.choice((500, 502, 503, 504))
+        return 200
+
+# ======================
+# DATABASE
+# ======================
+
+def install_db_faults(engine, injector: FaultInjector):
+    """Delay or drop statements on `engine` until remove_db_faults is called.
+
+    Hooks run inside SQLAlchemy's greenlet, so the delay awaits instead of
+    blocking the event loop: other sessions keep running, as they would
+    against a slow server. A drop raises the driver's OperationalError and
+    is flagged as a disconnect, so SQLAlchemy invalidates the pooled
+    connection the same way it would for a real one.
+    """
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        injector.counts["db_statements"] += 1
+        delay = injector.db_delay()
+        if delay:
+            await_only(asyncio.sleep(delay))
+        if injector.db_drop():
+            injector.counts["db_drops"] += 1
+            raise conn.dialect.loaded_dbapi.OperationalError(DROP_MESSAGE)
+
+    def handle_error(context):
+        if DROP_MESSAGE in str(context.original_exception):
+            context.is_disconnect = True
+
+    injector.db_hooks = [("before_cursor_execute", before_cursor_execute), ("handle_error", handle_error)]
+    for name, hook in injector.db_hooks:
+        event.listen(engine.sync_engine, name, hook)
+
+def remove_db_faults(engine, injector: FaultInjector):
+    for name, hook in injector.db_hooks:
+        event.remove(engine.sync_engine, name, hook)
+    injector.db_hooks = []
+
+# ======================
+# DISCORD
+# ======================
+
+# Discord answers a component click only within this window
+INTERACTION_DEADLINE_S = 3.0
+FAKE_APPLICATION_ID = 1_000_000_000_000_001
+FAKE_USER = {"id": str(FAKE_APPLICATION_ID), "username": "planner", "discriminator": "0", "avatar": None, "bot": True}
+
+def _json_response(data, status: int = 200, headers: dict = None):
+    from aiohttp import web
+
+    # discord.py only parses bodies whose content-type is exactly application/json
+    return web.Response(body=json.dumps(data).encode(), status=status, headers=headers, content_type="application/json")
+
+class FakeDiscordServer:
+    """Discord's REST API on localhost, with faults drawn from a FaultInjector.
+
+    point_discord_at() aims discord.py's Route.BASE here, so the real
+    HTTPClient, webhook adapter, rate limiter and retry loop handle every
+    429 and 5xx. Interaction callbacks that arrive after the 3 s deadline get
+    Discord's "Unknown interaction" 404; arrival times are kept per
+    interaction in `responses`.
+    """
+
+    def __init__(self, injector: FaultInjector):
+        self.injector = injector
+        self.interactions = {}  # interaction id -> created (monotonic)
+        self.responses = {}  # interaction id -> seconds from creation to a successful callback
+        self.replies = {}  # interaction id -> message content
+        self.expired = set()
+        self.runner = None
+        self.base_url = None
+        self.previous_base = None
+        self.next_interaction_id = FAKE_APPLICATION_ID
+
+    def interaction(self, client, channel_id: int, user_id: int, user_name: str):
+        """A component-click Interaction bound to `client`, as the gateway would deliver it"""
+        import discord
+
+        self.next_interaction_id += 1
+        interaction_id = self.next_interaction_id
+        self.interactions[interaction_id] = time.monotonic()
+        return discord.Interaction(data={
+            "id": str(interaction_id),
+            "application_id": str(FAKE_APPLICATION_ID),
+            "type": 3,
+            "token": f"token-{interaction_id}",
+            "version": 1,
+            "attachment_size_limit": 8 * 1024 * 1024,
+            "channel_id": str(channel_id),
+            "user": {"id": str(user_id), "username": user_name, "discriminator": "0", "avatar": None},
+            "data": {"custom_id": "replay", "component_type": 2}
+        }, state=client._connection)
+
+    async def start(self):
+        from aiohttp import web
+
+        app = web.Application()
+        app.router.add_get("/api/v10/users/@me", self.current_user)
+        app.router.add_get("/api/v10/oauth2/applications/@me", self.application)
+        app.router.add_put("/api/v10/applications/{app_id}/commands", self.sync_commands)
+        app.router.add_route("*", "/api/v10/channels/{channel_id}/messages", self.message)
+        app.router.add_route("*", "/api/v10/channels/{channel_id}/messages/{message_id}", self.message)
+        app.router.add_post("/api/v10/interactions/{interaction_id}/{token}/callback", self.interaction_callback)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://127.0.0.1:{port}/api/v10"
+
+    async def stop(self):
+        from discord.http import Route
+
+        if self.previous_base:
+            Route.BASE = self.previous_base
+        if self.runner:
+            await self.runner.cleanup()
+
+    def point_discord_at(self):
+        from discord.http import Route
+
+        self.previous_base = Route.BASE
+        Route.BASE = self.base_url
+
+    async def fault(self):
+        """A 429 or 5xx response to send instead of the real one, or None"""
+        from aiohttp import web
+
+        profile = self.injector.profile
+        counts = self.injector.counts
+        counts["discord_requests"] += 1
+        if profile.discord_latency_ms:
+            await asyncio.sleep(self.injector.random.uniform(0.5, 1.5) * profile.discord_latency_ms / 1000)
+        status = self.injector.discord_status()
+        if status == 200:
+            return None
+        counts[f"discord_{status}"] += 1
+        if status == 429:
+            return _json_response(
+                {"message": "You are being rate limited.", "retry_after": profile.retry_after_s, "global": False},
+                status=429,
+                # discord.py treats a 429 without Via as a Cloudflare ban
+                headers={"Via": "1.1 google", "Retry-After": str(profile.retry_after_s)}
+            )
+        return web.Response(status=status, text="upstream error (fault injection)")
+
+    async def current_user(self, request):
+        return _json_response(FAKE_USER)
+
+    async def application(self, request):
+        return _json_response({
+            "id": str(FAKE_APPLICATION_ID), "name": "planner", "description": "", "icon": None,
+            "bot_public": False, "bot_require_code_grant": False, "owner": FAKE_USER, "verify_key": "0" * 64, "flags": 0
+        })
+
+    async def sync_commands(self, request):
+        return _json_response([])
+
+    async def message(self, request):
+        faulted = await self.fault()
+        if faulted:
+            return faulted
+        body = await request.json() if request.can_read_body else {}
+        channel_id = request.match_info["channel_id"]
+        return _json_response({
+            "id": request.match_info.get("message_id", str(FAKE_APPLICATION_ID)),
+            "channel_id": channel_id,
+            "author": FAKE_USER,
+            "content": body.get("content") or "",
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "edited_timestamp": None,
+            "tts": False,
+            "mention_everyone": False,
+            "mentions": [],
+            "mention_roles": [],
+            "attachments": [],
+            "embeds": body.get("embeds") or [],
+            "pinned": False,
+            "type": 0
+        })
+
+    async def interaction_callback(self, request):
+        faulted = await self.fault()
+        if faulted:
+            return faulted
+        interaction_id = int(request.match_info["interaction_id"])
+        created = self.interactions.get(interaction_id)
+        if created is None or time.monotonic() - created > INTERACTION_DEADLINE_S:
+            self.expired.add(interaction_id)
+            return _json_response({"message": "Unknown interaction", "code": 10062}, status=404)
+        if interaction_id in self.responses:
+            return _json_response({"message": "Interaction has already been acknowledged.", "code": 40060}, status=400)
+        self.responses[interaction_id] = time.monotonic() - created
+        body = await request.json()
+        self.replies[interaction_id] = (body.get("data") or {}).get("content") or ""
+        return _json_response({"interaction": {"id": str(interaction_id), "type": 3}, "resource": {"type": body["type"]}})
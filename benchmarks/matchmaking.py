@@ -0,0 +1,39 @@
+import random
+import time
+from benchmarks.signup_storm import percentile
+
+def make_roster(users: int, roles: int, seed: int = 0):
+    """Random ranked preferences and tight capacities that just fit everyone"""
+    rng = random.Random(seed)
+    capacities = [users // roles + 1] * roles
+    preferences = [rng.sample(range(roles), rng.randint(1, roles)) for _ in range(users)]
+    # Everyone holds some slot today, like a real roster before finalizing
+    for i, prefs in enumerate(preferences):
+        current = i % roles
+        if current not in prefs:
+            prefs.append(current)
+    return capacities, preferences
+
+def run_solver_benchmark(users: int = 300, roles: int = 6, runs: int = 50) -> dict:
+    from services.matchmaking_service import assign_roles, UNASSIGNED
+
+    timings = []
+    unassigned = 0
+    first_choice = 0
+    for run in range(runs):
+        capacities, preferences = make_roster(users, roles, seed=run)
+        start = time.perf_counter()
+        assignment = assign_roles(capacities, preferences)
+        timings.append((time.perf_counter() - start) * 1000)
+        unassigned += sum(1 for role in assignment if role == UNASSIGNED)
+        first_choice += sum(1 for i, role in enumerate(assignment) if role == preferences[i][0])
+
+    return {
+        "users": users,
+        "roles": roles,
+        "runs": runs,
+        "p50_ms": percentile(timings, 50, digits=3),
+        "max_ms": round(max(timings), 3),
+        "first_choice_rate": round(first_choice / (users * runs), 3),
+        "unassigned": unassigned
+    }
@@ -0,0 +1,204 @@
+"""Replay recorded (or synthesized) button clicks against fresh activities.
+
+A trace is JSONL, one click per line, as bot.py writes it when
+INTERACTION_TRACE_PATH is set:
+
+    {"ts": 1718000000.12, "action": "join", "activity_id": 7, "user_id": 1, "user_name": "x", "role": "Tank"}
+
+action is "join", "quick_join" or "leave". Each recorded activity_id gets
+its own fresh activity with DEFAULT_SLOTS, so roles from other templates
+are rejected as full. Clicks fire at their recorded offsets whether or not
+earlier ones have finished, like real users.
+
+With the Discord layer on, each click is a discord.Interaction handed to
+bot.py's own button and command callbacks, with the bot logged in to a
+FakeDiscordServer. Without it, the services are called directly.
+"""
+import asyncio
+import json
+import random
+import time
+from collections import Counter
+from benchmarks.chaos import (
+    FaultInjector, FaultProfile, FakeDiscordServer, INTERACTION_DEADLINE_S, install_db_faults, remove_db_faults
+)
+from benchmarks.signup_storm import BENCH_USER_BASE, DEFAULT_SLOTS, percentile, seed_activity, check_roster, fetch_roster
+
+def load_trace(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        events = [json.loads(line) for line in f if line.strip()]
+    return sorted(events, key=lambda e: e["ts"])
+
+def save_trace(path: str, events: list):
+    with open(path, "w", encoding="utf-8") as f:
+        for e in events:
+            f.write(json.dumps(e, ensure_ascii=False) + "\n")
+
+def synthesize_trace(users: int = 300, activities: int = 1, window_s: float = 30.0, seed: int = None) -> list:
+    """A raid-ping burst: most clicks land in the first seconds of the window.
+
+    Some users double-click, some leave and rejoin as another role, and a
+    share use Quick Join.
+    """
+    rng = random.Random(seed)
+    roles = list(DEFAULT_SLOTS.keys())
+    weights = [1, 2, 2, 5]
+    events = []
+    for i in range(users):
+        user_id = BENCH_USER_BASE + 1 + i
+        activity_id = 1 + i % activities
+        ts = window_s * rng.random() ** 2
+        click = {"ts": ts, "activity_id": activity_id, "user_id": user_id, "user_name": f"replay-{i}"}
+        if rng.random() < 0.2:
+            events.append({**click, "action": "quick_join", "role": None})
+        else:
+            events.append({**click, "action": "join", "role": rng.choices(roles, weights)[0]})
+        if rng.random() < 0.1:
+            events.append({**events[-1], "ts": ts + 0.2})
+        if rng.random() < 0.05:
+            events.append({**click, "ts": ts + 5, "action": "leave", "role": None})
+            events.append({**click, "ts": ts + 6, "action": "join", "role": rng.choice(roles)})
+    return sorted(events, key=lambda e: e["ts"])
+
+async def check_consistency(activity_ids, slot_definition) -> list:
+    """No duplicate or overfilled signups, and participant_count matches the rows"""
+    from database.database import AsyncSessionLocal
+    from database.models import Activity
+
+    violations = []
+    for activity_id in activity_ids:
+        rows = await fetch_roster(activity_id)
+        violations += [f"activity {activity_id}: {v}" for v in check_roster(rows, slot_definition)]
+        async with AsyncSessionLocal() as session:
+            counter = (await session.get(Activity, activity_id)).participant_count
+        if counter != len(rows):
+            violations.append(f"activity {activity_id}: participant_count {counter}, {len(rows)} rows")
+    return violations
+
+def summarize_reply(content: str) -> str:
+    """Group replies like "✅ Joined as Tank" or "❌ Failed to join activity: (…)" by their gist"""
+    first_line = content.split("\n", 1)[0]
+    return first_line.split(":", 1)[0].split(" as ", 1)[0][:60]
+
+async def _service_click(e: dict, activity_id: int, outcomes: Counter):
+    from services.activity_service import ActivityService
+    from services.matchmaking_service import MatchmakingService
+
+    if e["action"] == "leave":
+        ok = await ActivityService.remove_participant(activity_id, e["user_id"])
+        outcomes["left" if ok else "not participating"] += 1
+        return
+    if e["action"] == "quick_join":
+        ok, error = await MatchmakingService.quick_join(activity_id, e["user_id"], e["user_name"])
+    else:
+        ok, error = await ActivityService.add_participant(activity_id, e["user_id"], e["user_name"], e["role"])
+    outcomes["joined" if ok else error] += 1
+
+async def _bot_click(e: dict, activity_id: int, client, server: FakeDiscordServer):
+    from bot import RoleButton, QuickJoinButton, leaveactivity
+
+    interaction = server.interaction(client, activity_id, e["user_id"], e["user_name"])
+    if e["action"] == "leave":
+        await leaveactivity.callback(interaction, activity_id)
+    elif e["action"] == "quick_join":
+        await QuickJoinButton(activity_id).callback(interaction)
+    else:
+        await RoleButton(e["role"], None, activity_id).callback(interaction)
+    return interaction.id
+
+async def replay_trace(events: list, profile: FaultProfile = None, speed: float = 1.0, discord_layer: bool = True) -> dict:
+    """Replay `events` under `profile` and report latency and consistency.
+
+    handler_* is how long each click's handler ran; response_* is how long
+    the user waited for a reply, taken from the fake server when the
+    Discord layer is on. over_deadline counts clicks that got no reply
+    within Discord's 3 s window.
+    """
+    from database.database import init_db, get_engine
+    from services.activity_service import ActivityService
+    from services.schedule_service import ScheduleService
+
+    profile = profile or FaultProfile()
+    await init_db()
+    activities = {}
+    for recorded_id in sorted({e["activity_id"] for e in events}):
+        activity, _ = await seed_activity()
+        # Channel and message IDs for the embed re-render to edit
+        await ActivityService.update_activity_message(activity.id, activity.id, activity.id)
+        activities[recorded_id] = activity.id
+    ScheduleService.invalidate()
+
+    injector = FaultInjector(profile)
+    server = client = None
+    if discord_layer:
+        from bot import bot as client
+        server = FakeDiscordServer(injector)
+        await server.start()
+        server.point_discord_at()
+        if client.is_closed():
+            # bot.py's client is a module global; reopen it after an earlier replay.
+            # close() also closed the HTTP connector, which login would reuse
+            import discord
+            client.clear()
+            client.http.connector = discord.utils.MISSING
+        await client.login("replay-token")
+
+    outcomes = Counter()
+    handler_latencies = []
+    interaction_ids = []
+
+    async def click(e: dict):
+        activity_id = activities[e["activity_id"]]
+        started = time.perf_counter()
+        try:
+            if discord_layer:
+                interaction_ids.append(await _bot_click(e, activity_id, client, server))
+            else:
+                await _service_click(e, activity_id, outcomes)
+        except Exception as ex:
+            # With the Discord layer, this is an error the bot's own handler let escape
+            outcomes[f"unhandled: {type(ex).__name__}"] += 1
+        handler_latencies.append((time.perf_counter() - started) * 1000)
+
+    install_db_faults(get_engine(), injector)
+    try:
+        loop = asyncio.get_running_loop()
+        origin = loop.time()
+        first_ts = events[0]["ts"] if events else 0
+        tasks = []
+        for e in events:
+            delay = origin + (e["ts"] - first_ts) / speed - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(click(e)))
+        await asyncio.gather(*tasks)
+        elapsed = loop.time() - origin
+    finally:
+        remove_db_faults(get_engine(), injector)
+        if discord_layer:
+            await client.close()
+            await server.stop()
+
+    if discord_layer:
+        response_latencies = [server.responses[i] * 1000 for i in interaction_ids if i in server.responses]
+        over_deadline = len(events) - len(response_latencies)
+        for i in interaction_ids:
+            outcomes[summarize_reply(server.replies[i]) if i in server.replies else "no reply in time"] += 1
+    else:
+        response_latencies = handler_latencies
+        over_deadline = sum(1 for ms in handler_latencies if ms > INTERACTION_DEADLINE_S * 1000)
+
+    return {
+        "events": len(events),
+        "elapsed_s": round(elapsed, 3),
+        "handler_p50_ms": percentile(handler_latencies, 50),
+        "handler_p95_ms": percentile(handler_latencies, 95),
+        "handler_p99_ms": percentile(handler_latencies, 99),
+        "response_p50_ms": percentile(response_latencies, 50),
+        "response_p95_ms": percentile(response_latencies, 95),
+        "response_p99_ms": percentile(response_latencies, 99),
+        "over_deadline": over_deadline,
+        "outcomes": dict(outcomes),
+        "faults": dict(injector.counts),
+        "violations": await check_consistency(activities.values(), DEFAULT_SLOTS)
+    }
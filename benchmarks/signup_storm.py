@@ -0,0 +1,116 @@
+import asyncio
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+DEFAULT_SLOTS = {
+    "Tank": {"count": 2, "unlimited": False, "emoji": None},
+    "Healer": {"count": 4, "unlimited": False, "emoji": None},
+    "Support": {"count": 4, "unlimited": False, "emoji": None},
+    "DPS": {"count": 10, "unlimited": True, "emoji": None}
+}
+
+BENCH_USER_BASE = 900_000_000_000
+
+def percentile(samples, pct: float, digits: int = 2):
+    """Nearest-rank percentile, rounded; None without samples"""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return round(ordered[index], digits)
+
+async def seed_activity(slot_definition=None):
+    """Create a throwaway template and activity to run a storm against"""
+    from services.template_service import TemplateService
+    from services.activity_service import ActivityService
+
+    slot_definition = slot_definition or DEFAULT_SLOTS
+    template = await TemplateService.create_template(
+        name=f"bench-{uuid.uuid4().hex[:8]}",
+        description="Benchmark template",
+        slot_definition=slot_definition,
+        creator_id=BENCH_USER_BASE,
+        creator_name="bench"
+    )
+    activity = await ActivityService.create_activity(
+        template_id=template.id,
+        scheduled_time=datetime.now(timezone.utc) + timedelta(hours=1),
+        location="Benchmark",
+        creator_id=BENCH_USER_BASE,
+        creator_name="bench"
+    )
+    return activity, slot_definition
+
+def check_roster(rows, slot_definition) -> list:
+    """Return a list of consistency violations for (user_id, role) rows"""
+    violations = []
+    users = Counter(user_id for user_id, _ in rows)
+    for user_id, count in users.items():
+        if count > 1:
+            violations.append(f"user {user_id} signed up {count} times")
+
+    roles = Counter(role for _, role in rows)
+    for role, count in roles.items():
+        slot_def = slot_definition.get(role)
+        if slot_def is None:
+            violations.append(f"unknown role {role}")
+        elif not slot_def.get('unlimited', False) and count > slot_def['count']:
+            violations.append(f"{role} overfilled: {count}/{slot_def['count']}")
+    return violations
+
+async def fetch_roster(activity_id: int):
+    from database.database import AsyncSessionLocal
+    from database.models import ActivityParticipant
+    from sqlalchemy.future import select
+
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(ActivityParticipant.user_id, ActivityParticipant.role)
+            .where(ActivityParticipant.activity_id == activity_id)
+        )
+        return result.all()
+
+async def run_signup_storm(users: int = 300, concurrency: int = 50) -> dict:
+    """Fire `users` concurrent role clicks at one activity and measure them"""
+    from database.database import init_db
+    from services.activity_service import ActivityService
+
+    await init_db()
+    activity, slot_definition = await seed_activity()
+    roles = list(slot_definition.keys())
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    outcomes = Counter()
+
+    async def click(i: int):
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                participant, error = await ActivityService.add_participant(
+                    activity.id, BENCH_USER_BASE + 1 + i, f"bench-{i}", roles[i % len(roles)]
+                )
+                outcomes["joined" if participant else (error or "rejected")] += 1
+            except Exception as e:
+                outcomes[f"error: {type(e).__name__}"] += 1
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(click(i) for i in range(users)))
+    elapsed = time.perf_counter() - started
+
+    rows = await fetch_roster(activity.id)
+    return {
+        "activity_id": activity.id,
+        "users": users,
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_per_s": round(users / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "outcomes": dict(outcomes),
+        "violations": check_roster(rows, slot_definition)
+    }
@@ -3,32 +3,40 @@ import time
 import asyncio
 import discord
 import json
+import re
 from rich.logging import RichHandler
 from rich.console import Console
 from rich.traceback import install
 from discord.ext import commands
 from discord import Intents, app_commands
 from discord.ui import Modal, TextInput, Button
-from config import DISCORD_TOKEN, DATABASE_URL
+from config import load_config, validate_config, MAX_ACTIVITY_MINUTES
 from database.database import init_db, AsyncSessionLocal
 from sqlalchemy import text
 from services.template_service import TemplateService
 from services.activity_service import ActivityService
+from services.job_service import JobService
+from services.matchmaking_service import MatchmakingService
 from services.user_service import UserService
+from services.timezone_service import TimezoneService, parse_time, zone_names
+from services.maintenance_service import MaintenanceService
+from services.schedule_service import ScheduleService
 from rbac import admin_only
-from datetime import datetime
+from embeds import create_activity_embed, create_export_file
+from datetime import datetime, timedelta, timezone
 
 
-install()
-console = Console()
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(message)s",
-    datefmt="[%X]",
-    handlers=[RichHandler(console=console, show_time=False, show_path=False)]
-)
+def setup_logging():
+    install()
+    console = Console()
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(message)s",
+        datefmt="[%X]",
+        handlers=[RichHandler(console=console, show_time=False, show_path=False)]
+    )
 
-logging.getLogger('sqlalchemy.engine').setLevel(logging.WARNING)
+    logging.getLogger('sqlalchemy.engine').setLevel(logging.WARNING)
 
 intents = Intents.default()
 intents.message_content = True
@@ -64,8 +72,9 @@ async def dbcheck(interaction: discord.Interaction):
             await session.execute(text("SELECT 1"))
             db_time = round((time.perf_counter() - start) * 1000, 2)
             
-            db_host = DATABASE_URL.split('@')[-1].split('/')[0] if '@' in DATABASE_URL else "localhost"
-            db_name = DATABASE_URL.split('/')[-1]
+            database_url = load_config().database_url
+            db_host = database_url.split('@')[-1].split('/')[0] if '@' in database_url else "localhost"
+            db_name = database_url.split('/')[-1]
             
             await interaction.response.send_message(
                 f"✅ Database connection healthy\n"
@@ -117,7 +126,7 @@ async def addtemplate(interaction: discord.Interaction, name: str):
                     try:
                         fixed_input = slot_input.replace("'", '"')
                         slot_definition = json.loads(fixed_input)
-                    except:
+                    except json.JSONDecodeError:
                         raise ValueError("Invalid JSON format")
                 
                 for role, data in slot_definition.items():
@@ -204,10 +213,12 @@ async def createactivity(interaction: discord.Interaction, template_name: str):
                 ephemeral=True
             )
         
+        zone = await TimezoneService.get_zone(interaction.user.id, interaction.guild_id)
+        
         class ActivityModal(Modal, title=f"Schedule: {template_name}"):
             time_input = TextInput(
-                label="Date & Time (YYYY-MM-DD HH:MM UTC)",
-                placeholder="2023-12-31 20:00",
+                label=f"Date & Time ({zone.key})"[:45],
+                placeholder="2024-12-31 20:00, tomorrow 20:00, fri 19:30",
                 required=True
             )
             location_input = TextInput(
@@ -215,55 +226,41 @@ async def createactivity(interaction: discord.Interaction, template_name: str):
                 placeholder="Brecilien, Caerleon, etc.",
                 required=True
             )
+            duration_input = TextInput(
+                label="Duration in minutes (optional)",
+                placeholder=str(load_config().default_activity_minutes),
+                required=False,
+                max_length=4
+            )
             
             async def on_submit(self, interaction: discord.Interaction):
                 try:
-                    scheduled_time = datetime.strptime(self.time_input.value, "%Y-%m-%d %H:%M")
-                    location = self.location_input.value
-                    
-                    async with AsyncSessionLocal() as session:  # NEW: Fresh session
-                        activity = await ActivityService.create_activity(
-                            template_id=template.id,
-                            scheduled_time=scheduled_time,
-                            location=location,
-                            creator_id=interaction.user.id,
-                            creator_name=interaction.user.display_name
-                        )
-                        
-                        # Generate embed WITHIN session
-                        embed = await create_activity_embed(activity)
-                        
-                        msg = await interaction.channel.send(embed=embed)
-                        await ActivityService.update_activity_message(activity.id, interaction.channel.id, msg.id)
-                        
-                        view = RoleSelectionView(activity.id, template.slot_definition)
-                        await msg.edit(view=view)
-                        
-                    await interaction.response.send_message(
-                        f"✅ Activity scheduled for {scheduled_time} in {location}",
-                        ephemeral=True
-                    )
-                    
+                    scheduled_time = parse_time(self.time_input.value, zone)
+                    if scheduled_time <= datetime.now(timezone.utc):
+                        raise ValueError("That time is in the past")
                     location = self.location_input.value
+                    duration = self.duration_input.value.strip()
+                    if duration and (not duration.isdigit() or not 0 < int(duration) <= MAX_ACTIVITY_MINUTES):
+                        raise ValueError(f"Duration must be a whole number of minutes, at most {MAX_ACTIVITY_MINUTES}")
                     
                     activity = await ActivityService.create_activity(
                         template_id=template.id,
                         scheduled_time=scheduled_time,
                         location=location,
                         creator_id=interaction.user.id,
-                        creator_name=interaction.user.display_name
+                        creator_name=interaction.user.display_name,
+                        duration_minutes=int(duration) if duration else None
                     )
                     
                     embed = await create_activity_embed(activity)
-                    msg = await interaction.channel.send(embed=embed)
+                    view = RoleSelectionView(activity.id, template.slot_definition)
+                    msg = await interaction.channel.send(embed=embed, view=view)
                     
                     await ActivityService.update_activity_message(activity.id, interaction.channel.id, msg.id)
-                    
-                    view = RoleSelectionView(activity.id, template.slot_definition)
-                    await msg.edit(view=view)
+                    await schedule_reminders(activity)
                     
                     await interaction.response.send_message(
-                        f"✅ Activity scheduled for {scheduled_time} in {location}",
+                        f"✅ Activity scheduled for <t:{int(scheduled_time.timestamp())}:F> in {location}",
                         ephemeral=True
                     )
                 except Exception as e:
@@ -284,25 +281,16 @@ async def createactivity(interaction: discord.Interaction, template_name: str):
 
 @bot.tree.command(name="leaveactivity", description="Leave an existing activity")
 async def leaveactivity(interaction: discord.Interaction, activity_id: int):
+    record_interaction("leave", activity_id, interaction.user)
     try:
         participant = await ActivityService.remove_participant(activity_id, interaction.user.id)
         
         if participant:
-            activity = await ActivityService.get_activity_by_id(activity_id)
-            embed = await create_activity_embed(activity)
-            
-            channel = bot.get_channel(activity.channel_id)
-            if channel:
-                try:
-                    msg = await channel.fetch_message(activity.message_id)
-                    await msg.edit(embed=embed)
-                except:
-                    logging.warning("Couldn't find activity message")
-            
             await interaction.response.send_message(
                 "✅ You've left the activity",
                 ephemeral=True
             )
+            await refresh_activity_message(activity_id)
         else:
             await interaction.response.send_message(
                 "❌ You're not participating in this activity",
@@ -310,8 +298,266 @@ async def leaveactivity(interaction: discord.Interaction, activity_id: int):
             )
     except Exception as e:
         logging.error(f"Leaveactivity error: {e}")
+        await send_error(interaction, f"❌ Failed to leave activity: {str(e)}")
+
+@bot.tree.command(name="exportactivity", description="Export an activity roster as JSON")
+@app_commands.checks.has_permissions(administrator=True)
+async def exportactivity(interaction: discord.Interaction, activity_id: int):
+    try:
+        if load_config().job_queue_enabled:
+            # The worker fills in this ephemeral response through the interaction
+            # token, so the roster stays visible to the requesting admin only
+            await interaction.response.defer(ephemeral=True, thinking=True)
+            try:
+                await JobService.enqueue(
+                    "export_activity",
+                    {"activity_id": activity_id, "interaction_token": interaction.token}
+                )
+            except Exception as e:
+                logging.error(f"Exportactivity error: {e}")
+                await interaction.edit_original_response(content=f"❌ Failed to queue export: {str(e)}")
+            return
+        
+        records = await MaintenanceService.export_activities(activity_id=activity_id)
+        if not records:
+            return await interaction.response.send_message(
+                "❌ Activity not found",
+                ephemeral=True
+            )
+        await interaction.response.send_message(
+            file=create_export_file(records, activity_id),
+            ephemeral=True
+        )
+    except Exception as e:
+        logging.error(f"Exportactivity error: {e}")
+        await interaction.response.send_message(
+            f"❌ Failed to export activity: {str(e)}",
+            ephemeral=True
+        )
+
+@bot.tree.command(name="copyroster", description="Pre-fill an activity with another activity's roster")
+@app_commands.checks.has_permissions(administrator=True)
+async def copyroster(interaction: discord.Interaction, source_id: int, target_id: int):
+    try:
+        copied, error = await ActivityService.copy_roster(source_id, target_id)
+        if error:
+            return await interaction.response.send_message(f"❌ {error}", ephemeral=True)
+        
+        await interaction.response.send_message(
+            f"✅ Copied {copied} participant(s) from `{source_id}` to `{target_id}`",
+            ephemeral=True
+        )
+        await refresh_activity_message(target_id)
+    except Exception as e:
+        logging.error(f"Copyroster error: {e}")
+        await interaction.response.send_message(
+            f"❌ Failed to copy roster: {str(e)}",
+            ephemeral=True
+        )
+
+@bot.tree.command(name="moveparticipants", description="Move participants to another activity")
+@app_commands.describe(members="Mentions or IDs to move; leave empty to move everyone")
+@app_commands.checks.has_permissions(administrator=True)
+async def moveparticipants(interaction: discord.Interaction, source_id: int, target_id: int, members: str = None):
+    try:
+        user_ids = parse_user_ids(members) if members else None
+        moved, error = await ActivityService.move_participants(source_id, target_id, user_ids)
+        if error:
+            return await interaction.response.send_message(f"❌ {error}", ephemeral=True)
+        
+        await interaction.response.send_message(
+            f"✅ Moved {moved} participant(s) from `{source_id}` to `{target_id}`",
+            ephemeral=True
+        )
+        await refresh_activity_message(source_id)
+        await refresh_activity_message(target_id)
+    except Exception as e:
+        logging.error(f"Moveparticipants error: {e}")
+        await interaction.response.send_message(
+            f"❌ Failed to move participants: {str(e)}",
+            ephemeral=True
+        )
+
+@bot.tree.command(name="bulkremove", description="Remove several participants at once")
+@app_commands.describe(members="Mentions or IDs to remove", no_shows="Also remove everyone marked as no-show")
+@app_commands.checks.has_permissions(administrator=True)
+async def bulkremove(interaction: discord.Interaction, activity_id: int, members: str = None, no_shows: bool = False):
+    try:
+        if not members and not no_shows:
+            return await interaction.response.send_message(
+                "❌ Give members to remove or set no_shows",
+                ephemeral=True
+            )
+        
+        removed = 0
+        if members:
+            removed += await ActivityService.bulk_remove(activity_id, user_ids=parse_user_ids(members))
+        if no_shows:
+            removed += await ActivityService.bulk_remove(activity_id, status="no_show")
+        
+        await interaction.response.send_message(
+            f"✅ Removed {removed} participant(s) from `{activity_id}`",
+            ephemeral=True
+        )
+        await refresh_activity_message(activity_id)
+    except Exception as e:
+        logging.error(f"Bulkremove error: {e}")
+        await interaction.response.send_message(
+            f"❌ Failed to remove participants: {str(e)}",
+            ephemeral=True
+        )
+
+@bot.tree.command(name="markattendance", description="Mark who showed up; everyone else becomes a no-show")
+@app_commands.describe(present="Mentions or IDs of participants who attended")
+@app_commands.checks.has_permissions(administrator=True)
+async def markattendance(interaction: discord.Interaction, activity_id: int, present: str):
+    try:
+        present_ids = parse_user_ids(present)
+        attended, no_shows = await ActivityService.mark_attendance(activity_id, present_ids)
+        
+        await interaction.response.send_message(
+            f"✅ Attendance saved for {attended + no_shows} participant(s): "
+            f"{attended} present, {no_shows} no-show",
+            ephemeral=True
+        )
+    except Exception as e:
+        logging.error(f"Markattendance error: {e}")
+        await interaction.response.send_message(
+            f"❌ Failed to mark attendance: {str(e)}",
+            ephemeral=True
+        )
+
+@bot.tree.command(name="setroles", description="Save your preferred roles for Quick Join")
+@app_commands.describe(roles="Roles in order of preference, e.g. Healer, Tank, DPS")
+async def setroles(interaction: discord.Interaction, roles: str):
+    try:
+        ranked = []
+        for role in roles.split(","):
+            role = role.strip()
+            if role and role not in ranked:
+                ranked.append(role)
+        
+        if not ranked or len(ranked) > 10:
+            return await interaction.response.send_message(
+                "❌ List between 1 and 10 roles, separated by commas",
+                ephemeral=True
+            )
+        
+        await UserService.set_role_preferences(interaction.user.id, interaction.user.display_name, ranked)
+        await interaction.response.send_message(
+            f"✅ Role preferences saved: {' > '.join(ranked)}",
+            ephemeral=True
+        )
+    except Exception as e:
+        logging.error(f"Setroles error: {e}")
         await interaction.response.send_message(
-            f"❌ Failed to leave activity: {str(e)}",
+            f"❌ Failed to save preferences: {str(e)}",
+            ephemeral=True
+        )
+
+@bot.tree.command(name="finalize", description="Rebalance an activity's roles by everyone's preferences")
+@app_commands.checks.has_permissions(administrator=True)
+async def finalize(interaction: discord.Interaction, activity_id: int):
+    try:
+        changed, error = await MatchmakingService.rebalance(activity_id)
+        if error:
+            return await interaction.response.send_message(f"❌ {error}", ephemeral=True)
+        
+        await interaction.response.send_message(
+            f"✅ Roster finalized, {changed} participant(s) moved to a preferred role",
+            ephemeral=True
+        )
+        if changed:
+            await refresh_activity_message(activity_id)
+    except Exception as e:
+        logging.error(f"Finalize error: {e}")
+        await interaction.response.send_message(
+            f"❌ Failed to finalize roster: {str(e)}",
+            ephemeral=True
+        )
+
+async def timezone_autocomplete(interaction: discord.Interaction, current: str):
+    current = current.lower()
+    matches = [name for name in zone_names() if current in name.lower()]
+    return [app_commands.Choice(name=name, value=name) for name in matches[:25]]
+
+@bot.tree.command(name="settimezone", description="Set your timezone for scheduling")
+@app_commands.describe(zone="IANA timezone, e.g. Europe/Berlin or America/New_York")
+@app_commands.autocomplete(zone=timezone_autocomplete)
+async def settimezone(interaction: discord.Interaction, zone: str):
+    try:
+        tz = await TimezoneService.set_user_timezone(interaction.user.id, interaction.user.display_name, zone)
+        now = datetime.now(tz)
+        await interaction.response.send_message(
+            f"✅ Timezone set to **{tz.key}** (local time now {now:%H:%M})",
+            ephemeral=True
+        )
+    except ValueError as e:
+        await interaction.response.send_message(f"❌ {e}", ephemeral=True)
+    except Exception as e:
+        logging.error(f"Settimezone error: {e}")
+        await interaction.response.send_message(
+            f"❌ Failed to set timezone: {str(e)}",
+            ephemeral=True
+        )
+
+@bot.tree.command(name="setservertimezone", description="Set the default timezone for this server")
+@app_commands.describe(zone="IANA timezone, e.g. Europe/Berlin or America/New_York")
+@app_commands.autocomplete(zone=timezone_autocomplete)
+@app_commands.checks.has_permissions(administrator=True)
+async def setservertimezone(interaction: discord.Interaction, zone: str):
+    try:
+        if not interaction.guild_id:
+            return await interaction.response.send_message(
+                "❌ Use this command in a server",
+                ephemeral=True
+            )
+        tz = await TimezoneService.set_guild_timezone(interaction.guild_id, zone)
+        await interaction.response.send_message(
+            f"✅ Server timezone set to **{tz.key}**. Members can override it with `/settimezone`",
+            ephemeral=True
+        )
+    except ValueError as e:
+        await interaction.response.send_message(f"❌ {e}", ephemeral=True)
+    except Exception as e:
+        logging.error(f"Setservertimezone error: {e}")
+        await interaction.response.send_message(
+            f"❌ Failed to set server timezone: {str(e)}",
+            ephemeral=True
+        )
+
+@bot.tree.command(name="myschedule", description="List your upcoming activities")
+async def myschedule(interaction: discord.Interaction):
+    try:
+        entries = await ScheduleService.get_schedule(interaction.user.id, limit=15)
+        if not entries:
+            return await interaction.response.send_message(
+                "📭 You're not signed up for any upcoming activities",
+                ephemeral=True
+            )
+        
+        lines = []
+        previous_end = None
+        for start, end, activity in entries:
+            # Entries come in start order, so an overlap is a start before the latest end so far
+            flag = " ⚠️ overlaps" if previous_end and start < previous_end else ""
+            previous_end = max(previous_end, end) if previous_end else end
+            lines.append(
+                f"`{activity.id}` **{activity.template.name}** - "
+                f"<t:{int(start.timestamp())}:F> to <t:{int(end.timestamp())}:t> "
+                f"in {activity.location}{flag}"
+            )
+        
+        embed = discord.Embed(
+            title="🗓️ Your Schedule",
+            description="\n".join(lines),
+            color=0x3498db
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+    except Exception as e:
+        logging.error(f"Myschedule error: {e}")
+        await interaction.response.send_message(
+            f"❌ Failed to load schedule: {str(e)}",
             ephemeral=True
         )
 
@@ -328,6 +574,15 @@ async def help_command(interaction: discord.Interaction):
         activity_value = (
             "`/createactivity <template>` - Schedule a new activity\n"
             "`/leaveactivity <id>` - Leave an activity by ID\n"
+            "`/myschedule` - List your upcoming activities\n"
+            "`/setroles <roles>` - Save preferred roles for Quick Join\n"
+            "`/settimezone <zone>` - Set your timezone\n"
+            "`/finalize <id>` - Rebalance roles by preference (Admin)\n"
+            "`/exportactivity <id>` - Export a roster as JSON (Admin)\n"
+            "`/copyroster <from> <to>` - Pre-fill a roster from another run (Admin)\n"
+            "`/moveparticipants <from> <to> [members]` - Move a party (Admin)\n"
+            "`/bulkremove <id> [members] [no_shows]` - Remove many at once (Admin)\n"
+            "`/markattendance <id> <present>` - Record who showed up (Admin)\n"
         )
         embed.add_field(name="📅 Activity Scheduling", value=activity_value, inline=False)
         
@@ -345,11 +600,14 @@ async def help_command(interaction: discord.Interaction):
         )
         embed.add_field(name="⚙️ Utility Commands", value=utility_value, inline=False)
         
-        admin_value = "`/sync` - Sync commands (Bot Owner)"
+        admin_value = (
+            "`/sync` - Sync commands (Bot Owner)\n"
+            "`/setservertimezone <zone>` - Default timezone for this server"
+        )
         embed.add_field(name="👑 Admin Commands", value=admin_value, inline=False)
         
         tips = (
-            "• All times are in UTC\n"
+            "• Times are read in your timezone (`/settimezone`), else the server's, else UTC\n"
             "• Use `/listtemplates` to see available activity types\n"
             "• Click role buttons to join activities\n"
             "• Pin activity messages for easy access!"
@@ -380,6 +638,72 @@ async def sync(interaction: discord.Interaction):
 # SUPPORTING COMPONENTS
 # ======================
 
+async def refresh_activity_message(activity_id: int):
+    """Re-render an activity embed, or leave it to worker.py in job queue mode"""
+    if load_config().job_queue_enabled:
+        await JobService.enqueue("render_activity", {"activity_id": activity_id}, dedupe_key=f"render:{activity_id}")
+        return
+    
+    activity = await ActivityService.get_activity_by_id(activity_id)
+    if not activity or not activity.channel_id or not activity.message_id:
+        return
+    
+    embed = await create_activity_embed(activity)
+    # Partial channel and message: edit by ID, without the channel cache or a fetch
+    channel = bot.get_partial_messageable(activity.channel_id)
+    try:
+        await channel.get_partial_message(activity.message_id).edit(embed=embed)
+    except discord.HTTPException as e:
+        logging.warning(f"Couldn't update activity message: {e}")
+
+async def send_error(interaction: discord.Interaction, message: str):
+    """Best-effort ephemeral error reply from a click handler's except block"""
+    if interaction.response.is_done():
+        return
+    try:
+        await interaction.response.send_message(message, ephemeral=True)
+    except discord.HTTPException as e:
+        # Usually "Unknown interaction": the 3 second window has passed
+        logging.warning(f"Couldn't send error reply: {e}")
+
+def record_interaction(action: str, activity_id: int, user, role: str = None):
+    """Append a signup click to INTERACTION_TRACE_PATH, for replay with `manage.py chaos`"""
+    path = load_config().interaction_trace_path
+    if not path:
+        return
+    event = {
+        "ts": time.time(),
+        "action": action,
+        "activity_id": activity_id,
+        "user_id": user.id,
+        "user_name": user.display_name,
+        "role": role
+    }
+    try:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(event, ensure_ascii=False) + "\n")
+    except OSError as e:
+        logging.warning(f"Couldn't record interaction: {e}")
+
+def parse_user_ids(text: str):
+    # Accepts "<@123> <@!456> 789", as typed or pasted into a slash command option
+    return sorted({int(user_id) for user_id in re.findall(r"\d{15,20}", text)})
+
+async def schedule_reminders(activity):
+    if not load_config().job_queue_enabled:
+        return
+    
+    for lead in load_config().reminder_lead_minutes:
+        run_at = activity.scheduled_time - timedelta(minutes=lead)
+        if run_at > datetime.now(timezone.utc):
+            await JobService.enqueue(
+                "send_reminder",
+                {"activity_id": activity.id, "lead_minutes": lead},
+                dedupe_key=f"reminder:{activity.id}:{lead}",
+                # jobs.run_at is naive UTC
+                run_at=run_at.astimezone(timezone.utc).replace(tzinfo=None)
+            )
+
 class RoleSelectionView(discord.ui.View):
     def __init__(self, activity_id, slot_definition):
         super().__init__(timeout=None)
@@ -389,6 +713,9 @@ class RoleSelectionView(discord.ui.View):
         for role, data in slot_definition.items():
             emoji = data.get('emoji')
             self.add_item(RoleButton(role, emoji, activity_id))
+        
+        if load_config().auto_assign_enabled:
+            self.add_item(QuickJoinButton(activity_id))
 
 class RoleButton(discord.ui.Button):
     def __init__(self, role, emoji, activity_id):
@@ -400,6 +727,7 @@ class RoleButton(discord.ui.Button):
         self.activity_id = activity_id
         
     async def callback(self, interaction: discord.Interaction):
+        record_interaction("join", self.activity_id, interaction.user, self.role)
         try:
             participant, error = await ActivityService.add_participant(
                 self.activity_id,
@@ -409,21 +737,13 @@ class RoleButton(discord.ui.Button):
             )
             
             if participant:
-                activity = await ActivityService.get_activity_by_id(self.activity_id)
-                embed = await create_activity_embed(activity)
-                
-                channel = bot.get_channel(activity.channel_id)
-                if channel:
-                    try:
-                        msg = await channel.fetch_message(activity.message_id)
-                        await msg.edit(embed=embed)
-                    except:
-                        logging.warning("Couldn't find activity message")
-                
-                await interaction.response.send_message(
-                    f"✅ Joined as {self.role}",
-                    ephemeral=True
-                )
+                # On success `error` carries an overlap warning, if any
+                message = f"✅ Joined as {self.role}"
+                if error:
+                    message += f"\n{error}"
+                # Reply first: the embed edit may wait out rate limits past Discord's 3 s window
+                await interaction.response.send_message(message, ephemeral=True)
+                await refresh_activity_message(self.activity_id)
             else:
                 await interaction.response.send_message(
                     f"❌ {error}",
@@ -431,66 +751,36 @@ class RoleButton(discord.ui.Button):
                 )
         except Exception as e:
             logging.error(f"Role selection error: {e}")
-            await interaction.response.send_message(
-                f"❌ Failed to join activity: {str(e)}",
-                ephemeral=True
-            )
+            await send_error(interaction, f"❌ Failed to join activity: {str(e)}")
 
-async def create_activity_embed(activity):
-    template = activity.template
-    participants = activity.participants
-    
-    role_participants = {}
-    for role in template.slot_definition.keys():
-        role_participants[role] = []
-    
-    for p in participants:
-        if p.role in role_participants:
-            role_participants[p.role].append(p.user.name)
-    
-    time_remaining = activity.scheduled_time - datetime.utcnow()
-    hours, remainder = divmod(time_remaining.total_seconds(), 3600)
-    minutes = remainder // 60
-    
-    embed = discord.Embed(
-        title=f"{template.name} - {activity.location}",
-        description=template.description,
-        color=0x3498db,
-        timestamp=activity.scheduled_time
-    )
-    
-    for role, data in template.slot_definition.items():
-        emoji = data.get('emoji', '')
-        count = data['count']
-        unlimited = data.get('unlimited', False)
-        
-        current = len(role_participants[role])
-        participants_list = "\n".join(role_participants[role]) or "None"
-        
-        count_display = f"{current}/{count}" if not unlimited else f"{current}+"
+class QuickJoinButton(discord.ui.Button):
+    def __init__(self, activity_id):
+        super().__init__(label="Quick Join", emoji="⚡", style=discord.ButtonStyle.success)
+        self.activity_id = activity_id
         
-        embed.add_field(
-            name=f"{emoji} {role} ({count_display})",
-            value=participants_list,
-            inline=True
-        )
-    
-    creator = await UserService.get_user(activity.created_by)
-    creator_name = creator.name if creator else "Unknown"
-    
-    embed.set_footer(text=f"Created by {creator_name}")
-    embed.add_field(
-        name="⏱️ Time Remaining",
-        value=f"{int(hours)}h {int(minutes)}m",
-        inline=False
-    )
-    embed.add_field(
-        name="🔢 Activity ID",
-        value=f"`{activity.id}`",
-        inline=False
-    )
-    
-    return embed
+    async def callback(self, interaction: discord.Interaction):
+        record_interaction("quick_join", self.activity_id, interaction.user)
+        try:
+            participant, error = await MatchmakingService.quick_join(
+                self.activity_id,
+                interaction.user.id,
+                interaction.user.display_name
+            )
+            
+            if participant:
+                message = f"✅ Joined as {participant.role}"
+                if error:
+                    message += f"\n{error}"
+                await interaction.response.send_message(message, ephemeral=True)
+                await refresh_activity_message(self.activity_id)
+            else:
+                await interaction.response.send_message(
+                    f"❌ {error}",
+                    ephemeral=True
+                )
+        except Exception as e:
+            logging.error(f"Quick join error: {e}")
+            await send_error(interaction, f"❌ Failed to join activity: {str(e)}")
 
 # ======================
 # EVENT HANDLERS
@@ -511,9 +801,10 @@ async def on_ready():
 # ======================
 
 async def main():
+    validate_config()
     try:
         await init_db()
-        await bot.start(DISCORD_TOKEN)
+        await bot.start(load_config().discord_token)
     except KeyboardInterrupt:
         await bot.close()
     except Exception as e:
@@ -523,6 +814,7 @@ async def main():
             await bot.close()
 
 if __name__ == "__main__":
+    setup_logging()
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
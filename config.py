@@ -1,25 +1,95 @@
 import os
 import sys
 import logging  # Added this import
-from dotenv import load_dotenv
-from typing import List
-
-load_dotenv(dotenv_path="secrets.env")
-
-DISCORD_TOKEN = os.getenv("DISCORD_TOKEN")
-DATABASE_URL = os.getenv("DATABASE_URL")
-BOT_PREFIX = os.getenv("BOT_PREFIX", "/")
-ADMIN_IDS = [int(id) for id in os.getenv("ADMIN_IDS", "").split(",") if id]
-
-def validate_config():
-    required = {
-        "DISCORD_TOKEN": DISCORD_TOKEN,
-        "DATABASE_URL": DATABASE_URL
-    }
-    
+from dataclasses import dataclass
+from typing import List, Optional
+
+SQLITE_DEFAULT_URL = "sqlite+aiosqlite:///planner.db"
+MAX_ACTIVITY_MINUTES = 1440  # longest duration the bot accepts; bounds overlap lookback
+
+@dataclass(frozen=True)
+class Settings:
+    discord_token: Optional[str]
+    database_url: Optional[str]
+    db_profile: str
+    bot_prefix: str
+    admin_ids: List[int]
+    job_queue_enabled: bool
+    worker_concurrency: int
+    worker_poll_interval: float
+    reminder_lead_minutes: List[int]
+    archive_path: str
+    auto_assign_enabled: bool
+    signup_conflict_mode: str
+    default_activity_minutes: int
+    interaction_trace_path: Optional[str]
+
+_settings: Optional[Settings] = None
+
+def load_config(dotenv_path: str = "secrets.env") -> Settings:
+    """Read settings from the environment once; nothing happens at import time"""
+    global _settings
+    if _settings is None:
+        from dotenv import load_dotenv
+        load_dotenv(dotenv_path=dotenv_path)
+
+        # "postgres" (default) or "sqlite" for local runs and in-process tests
+        db_profile = os.getenv("DB_PROFILE", "postgres").lower()
+        _settings = Settings(
+            discord_token=os.getenv("DISCORD_TOKEN"),
+            database_url=os.getenv("DATABASE_URL") or (SQLITE_DEFAULT_URL if db_profile == "sqlite" else None),
+            db_profile=db_profile,
+            bot_prefix=os.getenv("BOT_PREFIX", "/"),
+            admin_ids=[int(id) for id in os.getenv("ADMIN_IDS", "").split(",") if id],
+            # Hand re-renders, reminders and exports to worker.py instead of the gateway loop
+            job_queue_enabled=os.getenv("JOB_QUEUE_ENABLED", "false").lower() in ("1", "true", "yes"),
+            worker_concurrency=int(os.getenv("WORKER_CONCURRENCY", "4")),
+            worker_poll_interval=float(os.getenv("WORKER_POLL_INTERVAL", "1.0")),
+            reminder_lead_minutes=[int(m) for m in os.getenv("REMINDER_LEAD_MINUTES", "1440,60").split(",") if m],
+            archive_path=os.getenv("ARCHIVE_PATH", "archive.jsonl"),
+            # Show a "Quick Join" button that picks a role from saved preferences
+            auto_assign_enabled=os.getenv("AUTO_ASSIGN_ENABLED", "false").lower() in ("1", "true", "yes"),
+            # What to do when a signup overlaps another one: "off", "warn" or "reject"
+            signup_conflict_mode=os.getenv("SIGNUP_CONFLICT_MODE", "warn").lower(),
+            default_activity_minutes=int(os.getenv("DEFAULT_ACTIVITY_MINUTES", "120")),
+            # Append every signup click to this JSONL file for `manage.py chaos --trace`
+            interaction_trace_path=os.getenv("INTERACTION_TRACE_PATH") or None
+        )
+    return _settings
+
+def validate_config(require_discord: bool = True):
+    settings = load_config()
+    required = {"DATABASE_URL": settings.database_url}
+    if require_discord:
+        required["DISCORD_TOKEN"] = settings.discord_token
+
     for name, value in required.items():
         if not value:
             logging.critical(f"Missing required config: {name}")
             sys.exit(1)
 
-validate_config()
\ No newline at end of file
+    if settings.db_profile not in ("postgres", "sqlite"):
+        logging.critical(f"Unknown DB_PROFILE: {settings.db_profile}")
+        sys.exit(1)
+
+    if settings.signup_conflict_mode not in ("off", "warn", "reject"):
+        logging.critical(f"Unknown SIGNUP_CONFLICT_MODE: {settings.signup_conflict_mode}")
+        sys.exit(1)
+
+    if not 0 < settings.default_activity_minutes <= MAX_ACTIVITY_MINUTES:
+        logging.critical(f"DEFAULT_ACTIVITY_MINUTES must be between 1 and {MAX_ACTIVITY_MINUTES}")
+        sys.exit(1)
+
+_LEGACY_NAMES = {
+    "DISCORD_TOKEN": "discord_token",
+    "DATABASE_URL": "database_url",
+    "DB_PROFILE": "db_profile",
+    "BOT_PREFIX": "bot_prefix",
+    "ADMIN_IDS": "admin_ids",
+}
+
+def __getattr__(name):
+    # Keep `from config import DATABASE_URL` working, loaded on first access
+    if name in _LEGACY_NAMES:
+        return getattr(load_config(), _LEGACY_NAMES[name])
+    raise AttributeError(f"module 'config' has no attribute '{name}'")
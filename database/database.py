@@ -1,27 +1,106 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy import text
+from sqlalchemy import text, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.exc import SQLAlchemyError
-from config import DATABASE_URL
-from database.models import Base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from config import load_config
 import logging
 
-engine = create_async_engine(
-    DATABASE_URL,
-    echo=False,
-    pool_size=5,
-    max_overflow=10,
-    pool_timeout=30,
-    pool_recycle=3600,
-    future=True
-)
+def is_sqlite(url) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
 
-AsyncSessionLocal = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+def build_engine(url):
+    if not is_sqlite(url):
+        return create_async_engine(
+            url,
+            echo=False,
+            pool_size=5,
+            max_overflow=10,
+            pool_timeout=30,
+            pool_recycle=3600,
+            future=True
+        )
+
+    # SQLite has a single writer: one pooled connection queues sessions in FIFO
+    # order instead of letting them race on busy_timeout polling.
+    # An in-memory database lives as long as that pooled connection, so it
+    # gets the same pool rather than StaticPool, which would hand the one
+    # connection to every open session at once.
+    database = make_url(url).database
+    in_memory = not database or database == ":memory:"
+    sqlite_engine = create_async_engine(
+        url,
+        echo=False,
+        future=True,
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=30
+    )
+
+    @event.listens_for(sqlite_engine.sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        # Take over transaction control from the driver, see _begin_immediate
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        if not in_memory:
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.execute("PRAGMA busy_timeout=5000")
+        cursor.close()
+
+    @event.listens_for(sqlite_engine.sync_engine, "begin")
+    def _begin_immediate(conn):
+        # Deferred transactions that read and then write fail with SQLITE_BUSY
+        # under concurrency instead of waiting; take the write lock up front.
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+    return sqlite_engine
+
+_engine = None
+_session_factory = None
+
+def configure_database(url=None):
+    """Build the engine now, optionally for a URL other than DATABASE_URL"""
+    global _engine, _session_factory
+    url = url or load_config().database_url
+    if not url:
+        raise RuntimeError("DATABASE_URL is not configured")
+    _engine = build_engine(url)
+    _session_factory = sessionmaker(bind=_engine, class_=AsyncSession, expire_on_commit=False)
+    return _engine
+
+def get_engine():
+    if _engine is None:
+        configure_database()
+    return _engine
+
+def AsyncSessionLocal(**kwargs):
+    # Drop-in for the old module-level sessionmaker; the engine is built on first use
+    if _session_factory is None:
+        configure_database()
+    return _session_factory(**kwargs)
+
+async def dispose_engine():
+    global _engine, _session_factory
+    if _engine is not None:
+        await _engine.dispose()
+    _engine = None
+    _session_factory = None
+
+def __getattr__(name):
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module 'database.database' has no attribute '{name}'")
 
 async def init_db():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-    logging.info("✅ Database initialized")
+    from database.migrations import migrate
+
+    engine = get_engine()
+    applied = await migrate(engine)
+    logging.info(f"✅ Database initialized ({engine.dialect.name}, {applied} migration(s) applied)")
 
 async def check_db_health():
     try:
@@ -37,8 +116,15 @@ async def get_db_session():
     session = AsyncSessionLocal()
     try:
         yield session
-    except SQLAlchemyError as e:
-        await session.rollback()
-        raise e
+    except Exception:
+        # Any error, not only database ones, must leave no open transaction; a
+        # rollback that fails itself (dropped connection) is logged, not masked.
+        # GeneratorExit and CancelledError fall through to close(), which
+        # discards the transaction without awaiting a rollback
+        try:
+            await session.rollback()
+        except SQLAlchemyError as rollback_error:
+            logging.error(f"❌ Rollback failed: {rollback_error}")
+        raise
     finally:
-        await session.close()
\ No newline at end of file
+        await session.close()
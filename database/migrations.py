@@ -0,0 +1,300 @@
+"""Versioned schema migrations.
+
+`Base.metadata.create_all` only ever creates missing tables, so every change
+to an existing table is a numbered step here, recorded in `schema_version`.
+
+Steps are written so a growing production database can be upgraded while
+signups keep flowing on Postgres:
+- indexes are built with CREATE INDEX CONCURRENTLY outside a transaction
+- backfills run in small keyset batches, each committed on its own
+- constraints are added NOT VALID and validated by a later step
+- every DDL statement runs with a short lock_timeout so it fails fast
+  instead of queueing behind a long transaction and blocking signups
+
+Non-transactional steps must be idempotent: a crash between the step and
+its version row means it runs again on the next upgrade.
+
+The bot and every worker migrate on startup. On Postgres, migrate() holds
+an advisory lock, so processes starting together upgrade one at a time.
+Everywhere, a step's transaction re-checks `schema_version` before it runs.
+"""
+import logging
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Awaitable, Callable, List
+from sqlalchemy import text, inspect
+from database.models import Base, SchemaVersion, Job, GuildSettings
+
+LOCK_TIMEOUT = "5s"
+MIGRATION_LOCK_ID = 7_106_433_915  # pg_advisory_lock key, any constant shared by all processes
+BACKFILL_BATCH_SIZE = 1000
+
+@dataclass
+class Migration:
+    version: int
+    description: str
+    upgrade: Callable[..., Awaitable[None]]
+    transactional: bool = True
+
+MIGRATIONS: List[Migration] = []
+
+def migration(version: int, description: str, transactional: bool = True):
+    def decorator(func):
+        MIGRATIONS.append(Migration(version, description, func, transactional))
+        return func
+    return decorator
+
+def head_version() -> int:
+    return max((m.version for m in MIGRATIONS), default=0)
+
+# ======================
+# DIALECT-AWARE HELPERS
+# ======================
+
+def is_postgres(conn) -> bool:
+    return conn.dialect.name == "postgresql"
+
+async def set_lock_timeout(conn, local: bool = True):
+    if is_postgres(conn):
+        scope = "LOCAL " if local else ""
+        await conn.execute(text(f"SET {scope}lock_timeout = '{LOCK_TIMEOUT}'"))
+
+async def create_index(conn, name: str, table: str, columns: str, unique: bool = False):
+    unique_sql = "UNIQUE " if unique else ""
+    if not is_postgres(conn):
+        await conn.execute(text(f"CREATE {unique_sql}INDEX IF NOT EXISTS {name} ON {table} ({columns})"))
+        return
+
+    # A failed CONCURRENTLY build leaves an INVALID index behind that
+    # IF NOT EXISTS would happily skip; drop it and build again.
+    result = await conn.execute(
+        text(
+            "SELECT i.indisvalid FROM pg_class c "
+            "JOIN pg_index i ON i.indexrelid = c.oid WHERE c.relname = :name"
+        ),
+        {"name": name}
+    )
+    valid = result.scalar()
+    if valid is False:
+        logging.warning(f"Dropping invalid index {name} left by an interrupted build")
+        await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+
+    await conn.execute(text(f"CREATE {unique_sql}INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({columns})"))
+
+async def add_column(conn, table: str, column: str, ddl: str):
+    if is_postgres(conn):
+        await conn.execute(text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column} {ddl}"))
+        return
+
+    columns = await conn.run_sync(lambda sync_conn: inspect(sync_conn).get_columns(table))
+    if column not in {c["name"] for c in columns}:
+        await conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+
+async def add_check_constraint(conn, table: str, name: str, condition: str):
+    if not is_postgres(conn):
+        # SQLite cannot add constraints to an existing table; fresh databases
+        # get them from the model definition instead.
+        return
+
+    result = await conn.execute(text("SELECT 1 FROM pg_constraint WHERE conname = :name"), {"name": name})
+    if result.scalar():
+        return
+    await conn.execute(text(f"ALTER TABLE {table} ADD CONSTRAINT {name} CHECK ({condition}) NOT VALID"))
+
+async def validate_constraint(conn, table: str, name: str):
+    if is_postgres(conn):
+        # Only takes SHARE UPDATE EXCLUSIVE, so reads and writes continue
+        await conn.execute(text(f"ALTER TABLE {table} VALIDATE CONSTRAINT {name}"))
+
+async def backfill(conn, table: str, assignment: str, batch_size: int = BACKFILL_BATCH_SIZE):
+    """Run `UPDATE table SET assignment` over all rows in id-ordered batches"""
+    last_id = 0
+    total = 0
+    while True:
+        result = await conn.execute(
+            text(f"SELECT max(id) FROM (SELECT id FROM {table} WHERE id > :last_id ORDER BY id LIMIT :limit) batch"),
+            {"last_id": last_id, "limit": batch_size}
+        )
+        batch_end = result.scalar()
+        if batch_end is None:
+            break
+
+        result = await conn.execute(
+            text(f"UPDATE {table} SET {assignment} WHERE id > :last_id AND id <= :batch_end"),
+            {"last_id": last_id, "batch_end": batch_end}
+        )
+        total += result.rowcount
+        last_id = batch_end
+    logging.info(f"Backfilled {total} rows in {table}")
+
+# ======================
+# MIGRATIONS
+# ======================
+
+@migration(1, "Index signups by activity and role", transactional=False)
+async def _index_participants_activity_role(conn):
+    await create_index(conn, "ix_activity_participants_activity_role", "activity_participants", "activity_id, role")
+
+@migration(2, "Index signups by user", transactional=False)
+async def _index_participants_user(conn):
+    await create_index(conn, "ix_activity_participants_user", "activity_participants", "user_id")
+
+@migration(3, "Remove duplicate signups, keeping the earliest")
+async def _dedupe_participants(conn):
+    await conn.execute(text(
+        "DELETE FROM activity_participants WHERE id IN ("
+        " SELECT p.id FROM activity_participants p"
+        " JOIN activity_participants earlier"
+        "   ON earlier.activity_id = p.activity_id AND earlier.user_id = p.user_id AND earlier.id < p.id"
+        ")"
+    ))
+
+@migration(4, "One signup per user per activity", transactional=False)
+async def _unique_participants(conn):
+    await create_index(conn, "uq_activity_participants_activity_user", "activity_participants", "activity_id, user_id", unique=True)
+
+@migration(5, "Index activities by scheduled time", transactional=False)
+async def _index_activities_scheduled_time(conn):
+    await create_index(conn, "ix_activities_scheduled_time", "activities", "scheduled_time")
+
+@migration(6, "Add activities.participant_count")
+async def _add_participant_count(conn):
+    # Constant defaults are metadata-only on Postgres 11+, no table rewrite
+    await add_column(conn, "activities", "participant_count", "INTEGER NOT NULL DEFAULT 0")
+
+@migration(7, "Backfill activities.participant_count", transactional=False)
+async def _backfill_participant_count(conn):
+    await backfill(
+        conn,
+        "activities",
+        "participant_count = (SELECT count(*) FROM activity_participants p WHERE p.activity_id = activities.id)"
+    )
+
+@migration(8, "participant_count may not go negative (NOT VALID)")
+async def _check_participant_count(conn):
+    await add_check_constraint(conn, "activities", "ck_activities_participant_count", "participant_count >= 0")
+
+@migration(9, "Validate participant_count constraint", transactional=False)
+async def _validate_participant_count(conn):
+    await validate_constraint(conn, "activities", "ck_activities_participant_count")
+
+@migration(10, "Add jobs table for the background worker")
+async def _add_jobs(conn):
+    # A brand-new table locks nothing that signups touch
+    await conn.run_sync(lambda sync_conn: Job.__table__.create(sync_conn, checkfirst=True))
+
+@migration(11, "Add users.role_preferences")
+async def _add_role_preferences(conn):
+    await add_column(conn, "users", "role_preferences", "JSON")
+
+@migration(12, "Add users.timezone and guild_settings")
+async def _add_timezones(conn):
+    await add_column(conn, "users", "timezone", "VARCHAR(64)")
+    await conn.run_sync(lambda sync_conn: GuildSettings.__table__.create(sync_conn, checkfirst=True))
+
+@migration(13, "Store activities.scheduled_time as TIMESTAMPTZ")
+async def _scheduled_time_timestamptz(conn):
+    if not is_postgres(conn):
+        # SQLite has no zone-aware type; UTCDateTime reads naive rows as UTC
+        return
+    # Existing naive values are UTC. With the session zone set to UTC,
+    # Postgres 12+ converts timestamp -> timestamptz without rewriting the
+    # table or its indexes, so the ACCESS EXCLUSIVE lock is brief.
+    await conn.execute(text("SET LOCAL TimeZone = 'UTC'"))
+    await conn.execute(text("ALTER TABLE activities ALTER COLUMN scheduled_time TYPE TIMESTAMPTZ"))
+
+@migration(14, "Add activities.duration_minutes")
+async def _add_duration(conn):
+    await add_column(conn, "activities", "duration_minutes", "INTEGER")
+
+# ======================
+# RUNNER
+# ======================
+
+async def _applied_version(conn) -> int:
+    has_table = await conn.run_sync(lambda sync_conn: inspect(sync_conn).has_table(SchemaVersion.__tablename__))
+    if not has_table:
+        return 0
+    result = await conn.execute(text(f"SELECT max(version) FROM {SchemaVersion.__tablename__}"))
+    return result.scalar() or 0
+
+async def current_version(engine) -> int:
+    async with engine.connect() as conn:
+        return await _applied_version(conn)
+
+@asynccontextmanager
+async def migration_lock(engine):
+    """Let one process at a time migrate a Postgres database.
+
+    A session-level advisory lock on its own autocommit connection: it
+    holds no snapshot, so concurrent index builds don't wait for it, and it
+    is released when that connection closes, even after a crash.
+    """
+    if engine.dialect.name != "postgresql":
+        yield
+        return
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+        try:
+            yield
+        finally:
+            await conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATION_LOCK_ID})
+
+async def _record(conn, m: Migration):
+    await conn.execute(
+        SchemaVersion.__table__.insert().values(version=m.version, description=m.description)
+    )
+
+async def stamp(engine, version: int = None):
+    """Mark migrations up to `version` as applied without running them"""
+    version = head_version() if version is None else version
+    async with engine.begin() as conn:
+        applied = await _applied_version(conn)
+        for m in sorted(MIGRATIONS, key=lambda m: m.version):
+            if applied < m.version <= version:
+                await _record(conn, m)
+
+async def upgrade(engine, target: int = None):
+    target = head_version() if target is None else target
+    applied = await current_version(engine)
+    pending = [m for m in sorted(MIGRATIONS, key=lambda m: m.version) if applied < m.version <= target]
+
+    count = 0
+    for m in pending:
+        if m.transactional or engine.dialect.name != "postgresql":
+            async with engine.begin() as conn:
+                # Another process may have applied it since `applied` was read
+                if await _applied_version(conn) >= m.version:
+                    continue
+                logging.info(f"Applying migration {m.version}: {m.description}")
+                await set_lock_timeout(conn)
+                await m.upgrade(conn)
+                await _record(conn, m)
+                count += 1
+        else:
+            logging.info(f"Applying migration {m.version}: {m.description}")
+            async with engine.connect() as conn:
+                conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+                await set_lock_timeout(conn, local=False)
+                try:
+                    await m.upgrade(conn)
+                    await _record(conn, m)
+                    count += 1
+                finally:
+                    await conn.execute(text("RESET lock_timeout"))
+    return count
+
+async def migrate(engine):
+    """Create a fresh schema at head, or upgrade an existing one"""
+    async with migration_lock(engine):
+        async with engine.connect() as conn:
+            fresh = not await conn.run_sync(lambda sync_conn: inspect(sync_conn).has_table("activities"))
+
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+        if fresh:
+            await stamp(engine)
+            return 0
+        return await upgrade(engine)
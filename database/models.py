@@ -1,14 +1,40 @@
-from sqlalchemy import Column, BigInteger, Integer, String, Text, ForeignKey, TIMESTAMP, JSON
+from sqlalchemy import Column, BigInteger, Integer, String, Text, ForeignKey, TIMESTAMP, JSON, Index, CheckConstraint, text
 from sqlalchemy.orm import relationship, declarative_base
-from datetime import datetime
+from sqlalchemy.types import TypeDecorator
+from datetime import datetime, timezone
 
 Base = declarative_base()
 
+class UTCDateTime(TypeDecorator):
+    """TIMESTAMPTZ that always hands back aware UTC datetimes.
+
+    Naive values, from rows written before timezone support or from SQLite
+    which has no zone-aware type, are taken to be UTC.
+    """
+    impl = TIMESTAMP(timezone=True)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.astimezone(timezone.utc)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        if value.tzinfo is None:
+            return value.replace(tzinfo=timezone.utc)
+        return value.astimezone(timezone.utc)
+
 class User(Base):
     __tablename__ = "users"
     id = Column(BigInteger, primary_key=True)
     name = Column(Text)
     role = Column(String, default="user")
+    role_preferences = Column(JSON)  # Ranked role names for quick join, e.g. ["Healer", "Tank"]
+    timezone = Column(String(64))  # IANA name, e.g. "Europe/Berlin"
     activities_created = relationship("Activity", back_populates="creator")
     activity_signups = relationship("ActivityParticipant", back_populates="user")
 
@@ -25,17 +51,24 @@ class Activity(Base):
     id = Column(Integer, primary_key=True)
     template_id = Column(Integer, ForeignKey("activity_templates.id"))
     activity_type = Column(String)
-    scheduled_time = Column(TIMESTAMP)
+    scheduled_time = Column(UTCDateTime)
+    duration_minutes = Column(Integer)  # None means DEFAULT_ACTIVITY_MINUTES
     created_by = Column(BigInteger, ForeignKey("users.id"))
     created_at = Column(TIMESTAMP, default=datetime.utcnow)
     location = Column(String(100))
     message_id = Column(BigInteger)
     channel_id = Column(BigInteger)
+    participant_count = Column(Integer, nullable=False, default=0, server_default="0")
     
     creator = relationship("User", back_populates="activities_created")
     participants = relationship("ActivityParticipant", back_populates="activity")
     template = relationship("ActivityTemplate")
 
+    __table_args__ = (
+        Index("ix_activities_scheduled_time", "scheduled_time"),
+        CheckConstraint("participant_count >= 0", name="ck_activities_participant_count"),
+    )
+
 class ActivityParticipant(Base):
     __tablename__ = "activity_participants"
     id = Column(Integer, primary_key=True)
@@ -45,4 +78,48 @@ class ActivityParticipant(Base):
     status = Column(String(20), default="confirmed")
     
     user = relationship("User", back_populates="activity_signups")
-    activity = relationship("Activity", back_populates="participants")
\ No newline at end of file
+    activity = relationship("Activity", back_populates="participants")
+
+    __table_args__ = (
+        Index("ix_activity_participants_activity_role", "activity_id", "role"),
+        Index("ix_activity_participants_user", "user_id"),
+        Index("uq_activity_participants_activity_user", "activity_id", "user_id", unique=True),
+    )
+
+class GuildSettings(Base):
+    __tablename__ = "guild_settings"
+    guild_id = Column(BigInteger, primary_key=True)
+    timezone = Column(String(64))  # Default for members without their own
+
+class SchemaVersion(Base):
+    # Applied migrations, see database/migrations.py
+    __tablename__ = "schema_version"
+    version = Column(Integer, primary_key=True)
+    description = Column(Text)
+    applied_at = Column(TIMESTAMP, default=datetime.utcnow)
+
+class Job(Base):
+    # Background work queue shared by bot.py (producer) and worker.py (consumers)
+    __tablename__ = "jobs"
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(50), nullable=False)
+    payload = Column(JSON, default=dict)
+    status = Column(String(20), nullable=False, default="pending")  # pending, running, failed
+    dedupe_key = Column(String(100))
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=5)
+    run_at = Column(TIMESTAMP, nullable=False, default=datetime.utcnow)
+    locked_at = Column(TIMESTAMP)
+    locked_by = Column(String(100))
+    last_error = Column(Text)
+    created_at = Column(TIMESTAMP, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_jobs_status_run_at", "status", "run_at"),
+        # At most one pending job per key, so a burst of clicks queues a single re-render
+        Index(
+            "uq_jobs_pending_dedupe_key", "dedupe_key", unique=True,
+            postgresql_where=text("status = 'pending'"),
+            sqlite_where=text("status = 'pending'")
+        ),
+    )
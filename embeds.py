@@ -0,0 +1,73 @@
+import io
+import json
+import discord
+from services.user_service import UserService
+
+# Shared by bot.py and worker.py so either process can render an activity
+
+async def create_activity_embed(activity):
+    template = activity.template
+    participants = activity.participants
+    
+    role_participants = {}
+    for role in template.slot_definition.keys():
+        role_participants[role] = []
+    
+    for p in participants:
+        if p.role in role_participants:
+            role_participants[p.role].append(p.user.name)
+    
+    embed = discord.Embed(
+        title=f"{template.name} - {activity.location}",
+        description=template.description,
+        color=0x3498db,
+        timestamp=activity.scheduled_time
+    )
+    
+    for role, data in template.slot_definition.items():
+        emoji = data.get('emoji', '')
+        count = data['count']
+        unlimited = data.get('unlimited', False)
+        
+        current = len(role_participants[role])
+        participants_list = "\n".join(role_participants[role]) or "None"
+        
+        count_display = f"{current}/{count}" if not unlimited else f"{current}+"
+        
+        embed.add_field(
+            name=f"{emoji} {role} ({count_display})",
+            value=participants_list,
+            inline=True
+        )
+    
+    creator = await UserService.get_user(activity.created_by)
+    creator_name = creator.name if creator else "Unknown"
+    
+    embed.set_footer(text=f"Created by {creator_name}")
+    # Discord renders these in each viewer's own timezone and keeps the countdown live
+    starts = int(activity.scheduled_time.timestamp())
+    embed.add_field(
+        name="⏱️ Starts",
+        value=f"<t:{starts}:F> (<t:{starts}:R>)",
+        inline=False
+    )
+    embed.add_field(
+        name="🔢 Activity ID",
+        value=f"`{activity.id}`",
+        inline=False
+    )
+    
+    return embed
+
+def create_export_file(records, activity_id: int):
+    data = json.dumps(records, ensure_ascii=False, indent=2).encode("utf-8")
+    return discord.File(io.BytesIO(data), filename=f"activity-{activity_id}.json")
+
+def create_reminder_message(activity, lead_minutes: int):
+    mentions = " ".join(f"<@{p.user_id}>" for p in activity.participants)
+    hours, minutes = divmod(lead_minutes, 60)
+    lead = f"{hours}h {minutes}m" if hours and minutes else (f"{hours}h" if hours else f"{minutes}m")
+    return (
+        f"⏰ **{activity.template.name} - {activity.location}** starts in {lead} "
+        f"(Activity ID `{activity.id}`)\n{mentions}"
+    )
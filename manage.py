@@ -0,0 +1,228 @@
+"""Maintenance CLI for the activity planner.
+
+Usage: python manage.py <command> [options]
+
+Only the database and service layers are imported, and only by the command
+that needs them, so this starts quickly and never needs Discord credentials.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+async def cmd_migrate(args):
+    from database.database import init_db, get_engine
+    from database.migrations import current_version, head_version
+
+    if args.status:
+        version = await current_version(get_engine())
+        print(f"Schema version {version}, head {head_version()}")
+        return
+    await init_db()
+
+async def cmd_archive(args):
+    from services.maintenance_service import MaintenanceService
+
+    before = datetime.now(timezone.utc) - timedelta(days=args.older_than_days)
+    total = await MaintenanceService.write_archive(args.output, before, batch_size=args.batch_size)
+    logging.info(f"✅ Archived {total} activities scheduled before {before:%Y-%m-%d %H:%M} to {args.output}")
+
+async def cmd_reconcile(args):
+    from services.maintenance_service import MaintenanceService
+
+    issues = await MaintenanceService.reconcile_participants(fix=args.fix)
+    for issue in issues:
+        if issue["capacity"] is None:
+            logging.warning(f"Activity {issue['activity_id']}: {issue['count']} signups for unknown role {issue['role']}")
+        else:
+            logging.warning(
+                f"Activity {issue['activity_id']}: {issue['role']} has {issue['count']}/{issue['capacity']}"
+                f" (removed {issue['removed']})"
+            )
+    fixed = await MaintenanceService.reconcile_counters()
+    if fixed:
+        logging.warning(f"Corrected participant_count on {fixed} activities")
+    logging.info(f"✅ Reconcile finished, {len(issues)} issue(s)")
+
+async def cmd_export(args):
+    from services.maintenance_service import MaintenanceService
+
+    records = await MaintenanceService.export_activities(activity_id=args.activity_id, upcoming_only=args.upcoming)
+    out = open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+    try:
+        if args.format == "csv":
+            import csv
+            writer = csv.writer(out)
+            writer.writerow(["activity_id", "template", "scheduled_time", "location", "user_id", "name", "role", "status"])
+            for record in records:
+                for p in record["participants"]:
+                    writer.writerow([
+                        record["id"], record["template"], record["scheduled_time"], record["location"],
+                        p["user_id"], p["name"], p["role"], p["status"]
+                    ])
+        else:
+            json.dump(records, out, ensure_ascii=False, indent=2)
+            out.write("\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+async def cmd_benchmark(args):
+    from benchmarks.signup_storm import run_signup_storm
+
+    logging.getLogger().setLevel(logging.WARNING)
+    if args.solver:
+        from benchmarks.matchmaking import run_solver_benchmark
+        stats = run_solver_benchmark(users=args.users)
+        print(json.dumps(stats, indent=2))
+        if stats["unassigned"]:
+            sys.exit(1)
+        return
+
+    stats = await run_signup_storm(users=args.users, concurrency=args.concurrency)
+    print(json.dumps(stats, indent=2))
+    if stats["violations"]:
+        sys.exit(1)
+
+async def cmd_chaos(args):
+    from benchmarks.chaos import FaultProfile
+    from benchmarks.replay import load_trace, save_trace, synthesize_trace, replay_trace
+
+    logging.getLogger().setLevel(logging.CRITICAL)
+    if args.trace:
+        events = load_trace(args.trace)
+    else:
+        events = synthesize_trace(users=args.users, activities=args.activities, window_s=args.window, seed=args.seed)
+    if args.save_trace:
+        save_trace(args.save_trace, events)
+
+    profile = FaultProfile(
+        db_latency_ms=args.db_latency_ms,
+        db_jitter_ms=args.db_jitter_ms,
+        db_spike_rate=args.db_spike_rate,
+        db_spike_ms=args.db_spike_ms,
+        db_drop_rate=args.db_drop_rate,
+        discord_latency_ms=args.discord_latency_ms,
+        discord_429_rate=args.discord_429_rate,
+        discord_5xx_rate=args.discord_5xx_rate,
+        retry_after_s=args.retry_after,
+        seed=args.seed
+    )
+    discord_layer = not args.no_discord
+    report = {}
+    if not args.skip_baseline:
+        report["baseline"] = await replay_trace(events, speed=args.speed, discord_layer=discord_layer)
+    report["faults"] = await replay_trace(events, profile, speed=args.speed, discord_layer=discord_layer)
+    if "baseline" in report:
+        base, faulted = report["baseline"], report["faults"]
+        # No ratio when a run has no samples: clicks nobody answered are
+        # counted in over_deadline, not as a latency of 0
+        report["degradation"] = {
+            key: round(faulted[key] / base[key], 2) if base[key] and faulted[key] is not None else None
+            for key in ("handler_p50_ms", "handler_p95_ms", "response_p50_ms", "response_p95_ms")
+        }
+        report["degradation"]["over_deadline"] = {"baseline": base["over_deadline"], "faults": faulted["over_deadline"]}
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if any(run["violations"] for run in report.values() if isinstance(run, dict) and "violations" in run):
+        sys.exit(1)
+
+async def cmd_enqueue(args):
+    from services.job_service import JobService
+
+    job = await JobService.enqueue(args.kind, json.loads(args.payload), dedupe_key=args.dedupe_key)
+    if job:
+        logging.info(f"✅ Queued job {job.id} ({job.kind})")
+    else:
+        logging.info(f"ℹ️ An identical {args.kind} job is already pending")
+
+COMMANDS = {
+    "migrate": cmd_migrate,
+    "archive": cmd_archive,
+    "reconcile": cmd_reconcile,
+    "export": cmd_export,
+    "benchmark": cmd_benchmark,
+    "chaos": cmd_chaos,
+    "enqueue": cmd_enqueue,
+}
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="manage.py", description="Activity planner maintenance tasks")
+    parser.add_argument("--database-url", help="Override DATABASE_URL for this run")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    migrate = sub.add_parser("migrate", help="Create or upgrade the database schema")
+    migrate.add_argument("--status", action="store_true", help="Show the applied and latest schema versions")
+
+    archive = sub.add_parser("archive", help="Move old activities out of the database into a JSONL file")
+    archive.add_argument("--older-than-days", type=int, default=30)
+    archive.add_argument("--batch-size", type=int, default=500)
+    archive.add_argument("--output", default="archive.jsonl")
+
+    reconcile = sub.add_parser("reconcile", help="Check signups against template slot capacities")
+    reconcile.add_argument("--fix", action="store_true", help="Remove the latest signups of overfilled roles")
+
+    export = sub.add_parser("export", help="Export activities and rosters")
+    export.add_argument("--activity-id", type=int)
+    export.add_argument("--upcoming", action="store_true")
+    export.add_argument("--format", choices=["json", "csv"], default="json")
+    export.add_argument("--output")
+
+    benchmark = sub.add_parser("benchmark", help="Run an in-process signup storm (temporary SQLite by default)")
+    benchmark.add_argument("--users", type=int, default=300)
+    benchmark.add_argument("--concurrency", type=int, default=50)
+    benchmark.add_argument("--solver", action="store_true", help="Time the role assignment solver instead")
+
+    chaos = sub.add_parser("chaos", help="Replay a click trace with injected DB and Discord faults (temporary SQLite by default)")
+    chaos.add_argument("--trace", help="JSONL trace recorded with INTERACTION_TRACE_PATH; synthesized if omitted")
+    chaos.add_argument("--save-trace", help="Write the replayed trace here")
+    chaos.add_argument("--users", type=int, default=300)
+    chaos.add_argument("--activities", type=int, default=1)
+    chaos.add_argument("--window", type=float, default=30.0, help="Seconds the synthesized clicks spread over")
+    chaos.add_argument("--speed", type=float, default=1.0, help="Replay this many times faster than recorded")
+    chaos.add_argument("--seed", type=int)
+    chaos.add_argument("--db-latency-ms", type=float, default=50.0)
+    chaos.add_argument("--db-jitter-ms", type=float, default=25.0)
+    chaos.add_argument("--db-spike-rate", type=float, default=0.02)
+    chaos.add_argument("--db-spike-ms", type=float, default=1000.0)
+    chaos.add_argument("--db-drop-rate", type=float, default=0.005)
+    chaos.add_argument("--discord-latency-ms", type=float, default=100.0)
+    chaos.add_argument("--discord-429-rate", type=float, default=0.05)
+    chaos.add_argument("--discord-5xx-rate", type=float, default=0.02)
+    chaos.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with injected 429s")
+    chaos.add_argument("--no-discord", action="store_true", help="Call the services directly instead of bot.py's handlers")
+    chaos.add_argument("--skip-baseline", action="store_true", help="Only run with faults")
+
+    enqueue = sub.add_parser("enqueue", help="Queue a job for worker.py, e.g. archive_activities from cron")
+    enqueue.add_argument("kind")
+    enqueue.add_argument("payload", nargs="?", default="{}", help="JSON payload")
+    enqueue.add_argument("--dedupe-key")
+
+    return parser
+
+async def run(args):
+    from database.database import configure_database, dispose_engine
+
+    configure_database(args.database_url)
+    try:
+        await COMMANDS[args.command](args)
+    finally:
+        await dispose_engine()
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    if args.command in ("benchmark", "chaos") and not args.database_url:
+        args.database_url = "sqlite+aiosqlite:///" + os.path.join(tempfile.mkdtemp(prefix="planner-bench-"), "bench.db")
+    if not args.database_url:
+        from config import validate_config
+        validate_config(require_discord=False)
+
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,8 @@
-from config import ADMIN_IDS
+from config import load_config
 from functools import wraps
 
 def is_admin(user_id: int) -> bool:
-    return user_id in ADMIN_IDS
+    return user_id in load_config().admin_ids
 
 def admin_only():
     def decorator(func):
@@ -1,15 +1,21 @@
 import logging
 from database.database import AsyncSessionLocal
-from database.models import Activity, ActivityParticipant, ActivityTemplate
+from database.models import Activity, ActivityParticipant, ActivityTemplate, User
 from sqlalchemy.future import select
-from sqlalchemy import delete, func
+from sqlalchemy import delete, func, update, case, literal, and_, exists
+from sqlalchemy.orm import aliased
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import selectinload  # Added missing import
 from services.user_service import UserService
-from datetime import datetime
+from services.schedule_service import ScheduleService
+from config import load_config
+from datetime import datetime, timezone
+
+UNLIMITED_CAPACITY = 2**31 - 1
 
 class ActivityService:
     @staticmethod
-    async def create_activity(template_id: int, scheduled_time, location: str, creator_id: int, creator_name: str):
+    async def create_activity(template_id: int, scheduled_time, location: str, creator_id: int, creator_name: str, duration_minutes: int = None):
         async with AsyncSessionLocal() as session:
             # Ensure user exists
             creator = await UserService.get_or_create_user(creator_id, creator_name)
@@ -24,6 +30,7 @@ class ActivityService:
                 template_id=template_id,
                 scheduled_time=scheduled_time,
                 location=location,
+                duration_minutes=duration_minutes,
                 created_by=creator_id,
                 template=template  # Manually set the relationship
             )
@@ -32,8 +39,23 @@ class ActivityService:
             await session.commit()
             await session.refresh(activity)
             
-            # Return a fresh instance with all relationships loaded
-            return await session.get(Activity, activity.id, options=[selectinload(Activity.template)])
+            # Return the instance with all relationships loaded. session.get would hand
+            # back the identity-map copy as is, without running the loader options
+            result = await session.execute(
+                select(Activity)
+                .where(Activity.id == activity.id)
+                .options(*ActivityService._render_options())
+                .execution_options(populate_existing=True)
+            )
+            return result.scalars().one()
+
+    @staticmethod
+    def _render_options():
+        # Everything create_activity_embed touches, loaded up front
+        return [
+            selectinload(Activity.template),
+            selectinload(Activity.participants).selectinload(ActivityParticipant.user)
+        ]
 
     @staticmethod
     async def get_activity_by_id(activity_id: int):
@@ -41,7 +63,7 @@ class ActivityService:
             result = await session.execute(
                 select(Activity)
                 .where(Activity.id == activity_id)
-                .options(selectinload(Activity.template))  # Fixed syntax
+                .options(*ActivityService._render_options())
             )
             return result.scalars().first()
     
@@ -50,22 +72,32 @@ class ActivityService:
         async with AsyncSessionLocal() as session:
             result = await session.execute(
                 select(Activity)
-                .where(Activity.scheduled_time > datetime.utcnow())
+                .where(Activity.scheduled_time > datetime.now(timezone.utc))
                 .options(selectinload(Activity.template))  # Fixed syntax
             )
             return result.scalars().all()
     
     @staticmethod
-    async def add_participant(activity_id: int, user_id: int, user_name: str, role: str):
+    async def add_participant(activity_id: int, user_id: int, user_name: str, role: str, conflict_mode: str = None):
+        """Sign a user up for a role.
+
+        Returns (participant, None) on success, (None, error) on refusal, or
+        (participant, warning) when the signup overlaps another one and
+        conflict_mode (default SIGNUP_CONFLICT_MODE) is "warn".
+        """
+        conflict_mode = conflict_mode or load_config().signup_conflict_mode
         async with AsyncSessionLocal() as session:
             # Ensure user exists
             user = await UserService.get_or_create_user(user_id, user_name)
             
-            # Get activity with template preloaded
+            # Get activity with template preloaded. Locking the row serializes
+            # signups with each other and with rebalance, so the role count
+            # below still holds at commit
             result = await session.execute(
                 select(Activity)
                 .where(Activity.id == activity_id)
                 .options(selectinload(Activity.template))  # Fixed syntax
+                .with_for_update()
             )
             activity = result.scalars().first()
             
@@ -99,29 +131,78 @@ class ActivityService:
                 if current_count >= max_count:
                     return None, "Role is full"
             
+            warning = None
+            if conflict_mode == "reject":
+                # Two signups by one user to different activities lock different
+                # activity rows; the user row serializes them, and the index is
+                # reloaded under that lock since the cache may predate the other one
+                await session.execute(select(User.id).where(User.id == user_id).with_for_update())
+            if conflict_mode != "off":
+                conflicts = await ScheduleService.find_conflicts(
+                    user_id, activity, session, refresh=conflict_mode == "reject"
+                )
+                if conflicts:
+                    ids = ", ".join(f"`{other_id}`" for _, _, other_id in conflicts)
+                    if conflict_mode == "reject":
+                        return None, f"You're already signed up for an overlapping activity ({ids})"
+                    warning = f"⚠️ This overlaps your signup for activity {ids}"
+            
             participant = ActivityParticipant(
                 activity_id=activity_id,
                 user_id=user_id,
                 role=role
             )
             session.add(participant)
-            await session.commit()
+            try:
+                # The INSERT must fail in here, not in the UPDATE's autoflush
+                await session.flush()
+                await session.execute(
+                    update(Activity)
+                    .where(Activity.id == activity_id)
+                    .values(participant_count=Activity.participant_count + 1)
+                )
+                await session.commit()
+            except IntegrityError:
+                # A concurrent click from the same user won the unique index
+                await session.rollback()
+                return None, "Already participating"
             await session.refresh(participant)
-            return participant, None
+            ScheduleService.record_signup(user_id, activity)
+            return participant, warning
     
     @staticmethod
     async def remove_participant(activity_id: int, user_id: int):
         async with AsyncSessionLocal() as session:
+            # Same row lock as add_participant, so two leaves by one user serialize
+            await session.execute(select(Activity.id).where(Activity.id == activity_id).with_for_update())
+            # Select-then-delete instead of DELETE ... RETURNING so every backend works
             result = await session.execute(
-                delete(ActivityParticipant)
+                select(ActivityParticipant)
                 .where(
                     ActivityParticipant.activity_id == activity_id,
                     ActivityParticipant.user_id == user_id
                 )
-                .returning(ActivityParticipant)
+            )
+            participant = result.scalars().first()
+            if not participant:
+                return None
+            
+            deleted = await session.execute(
+                delete(ActivityParticipant)
+                .where(ActivityParticipant.id == participant.id)
+            )
+            if deleted.rowcount != 1:
+                # Another leave removed the row first; its decrement already ran
+                await session.rollback()
+                return None
+            await session.execute(
+                update(Activity)
+                .where(Activity.id == activity_id)
+                .values(participant_count=Activity.participant_count - 1)
             )
             await session.commit()
-            return result.scalars().first()
+            ScheduleService.record_leave(user_id, activity_id)
+            return participant
     
     @staticmethod
     async def update_activity_message(activity_id: int, channel_id: int, message_id: int):
@@ -132,4 +213,178 @@ class ActivityService:
                 activity.message_id = message_id
                 await session.commit()
                 return True
-            return False
\ No newline at end of file
+            return False
+
+    # ======================
+    # BULK OPERATIONS
+    # ======================
+    # Each runs one set-based statement, plus a counter refresh, no matter
+    # how many participants it touches.
+
+    @staticmethod
+    async def _get_slot_definition(session, activity_id: int):
+        result = await session.execute(
+            select(ActivityTemplate.slot_definition)
+            .join(Activity, Activity.template_id == ActivityTemplate.id)
+            .where(Activity.id == activity_id)
+        )
+        return result.scalar()
+
+    @staticmethod
+    async def _lock_activities(session, activity_ids):
+        # Same row lock as add_participant, taken in id order so two bulk
+        # operations can't deadlock; the capacity check then sees every signup
+        await session.execute(
+            select(Activity.id)
+            .where(Activity.id.in_(sorted(set(activity_ids))))
+            .order_by(Activity.id)
+            .with_for_update()
+        )
+
+    @staticmethod
+    def _capped_candidates(source_id: int, target_id: int, slot_definition: dict, user_ids=None):
+        """Source signups that fit into the target's free slots, first come first served.
+
+        Users already in the target and roles the target doesn't offer are
+        skipped. Returns a subquery of (id, user_id, role, status).
+        """
+        source = aliased(ActivityParticipant)
+        target = aliased(ActivityParticipant)
+
+        conditions = [
+            source.activity_id == source_id,
+            source.status != "no_show",
+            ~exists().where(and_(target.activity_id == target_id, target.user_id == source.user_id))
+        ]
+        if user_ids is not None:
+            conditions.append(source.user_id.in_(user_ids))
+
+        ranked = (
+            select(
+                source.id,
+                source.user_id,
+                source.role,
+                source.status,
+                func.row_number().over(partition_by=source.role, order_by=source.id).label("rn")
+            )
+            .where(*conditions)
+            .subquery()
+        )
+
+        capacity = case(
+            {
+                role: (UNLIMITED_CAPACITY if data.get('unlimited', False) else data.get('count', 0))
+                for role, data in slot_definition.items()
+            },
+            value=ranked.c.role,
+            else_=0
+        ) if slot_definition else literal(0)
+        taken = (
+            select(func.count(target.id))
+            .where(target.activity_id == target_id, target.role == ranked.c.role)
+            .scalar_subquery()
+        )
+        return (
+            select(ranked.c.id, ranked.c.user_id, ranked.c.role, ranked.c.status)
+            .where(ranked.c.rn + taken <= capacity)
+        )
+
+    @staticmethod
+    async def _refresh_participant_counts(session, activity_ids):
+        actual = (
+            select(func.count(ActivityParticipant.id))
+            .where(ActivityParticipant.activity_id == Activity.id)
+            .scalar_subquery()
+        )
+        await session.execute(
+            update(Activity)
+            .where(Activity.id.in_(activity_ids))
+            .values(participant_count=actual)
+            .execution_options(synchronize_session=False)
+        )
+
+    @staticmethod
+    async def copy_roster(source_id: int, target_id: int):
+        """Pre-fill `target_id` with the signups of `source_id`; returns how many were copied"""
+        async with AsyncSessionLocal() as session:
+            await ActivityService._lock_activities(session, [target_id])
+            slot_definition = await ActivityService._get_slot_definition(session, target_id)
+            if slot_definition is None:
+                return None, "Activity not found"
+
+            candidates = ActivityService._capped_candidates(source_id, target_id, slot_definition).subquery()
+            result = await session.execute(
+                ActivityParticipant.__table__.insert().from_select(
+                    ["activity_id", "user_id", "role", "status"],
+                    select(literal(target_id), candidates.c.user_id, candidates.c.role, literal("confirmed"))
+                )
+            )
+            await ActivityService._refresh_participant_counts(session, [target_id])
+            await session.commit()
+            ScheduleService.invalidate()
+            return result.rowcount, None
+
+    @staticmethod
+    async def move_participants(source_id: int, target_id: int, user_ids=None):
+        """Move signups (all, or only `user_ids`) to another activity, keeping their roles"""
+        async with AsyncSessionLocal() as session:
+            await ActivityService._lock_activities(session, [source_id, target_id])
+            slot_definition = await ActivityService._get_slot_definition(session, target_id)
+            if slot_definition is None:
+                return None, "Activity not found"
+
+            candidates = ActivityService._capped_candidates(source_id, target_id, slot_definition, user_ids).subquery()
+            result = await session.execute(
+                update(ActivityParticipant)
+                .where(ActivityParticipant.id.in_(select(candidates.c.id)))
+                .values(activity_id=target_id)
+                .execution_options(synchronize_session=False)
+            )
+            await ActivityService._refresh_participant_counts(session, [source_id, target_id])
+            await session.commit()
+            ScheduleService.invalidate(user_ids)
+            return result.rowcount, None
+
+    @staticmethod
+    async def bulk_remove(activity_id: int, user_ids=None, status: str = None):
+        """Remove the given users and/or everyone with `status` (e.g. "no_show")"""
+        if user_ids is None and status is None:
+            return 0
+        async with AsyncSessionLocal() as session:
+            query = delete(ActivityParticipant).where(ActivityParticipant.activity_id == activity_id)
+            if user_ids is not None:
+                query = query.where(ActivityParticipant.user_id.in_(user_ids))
+            if status is not None:
+                query = query.where(ActivityParticipant.status == status)
+            result = await session.execute(query.execution_options(synchronize_session=False))
+            await ActivityService._refresh_participant_counts(session, [activity_id])
+            await session.commit()
+            ScheduleService.invalidate(user_ids if status is None else None)
+            return result.rowcount
+
+    @staticmethod
+    async def mark_attendance(activity_id: int, present_user_ids):
+        """Mark the listed users as attended and everyone else in the roster as no_show.
+
+        Returns (present, no_show) counts over the roster; listed users who
+        aren't signed up count towards neither.
+        """
+        async with AsyncSessionLocal() as session:
+            await session.execute(
+                update(ActivityParticipant)
+                .where(ActivityParticipant.activity_id == activity_id)
+                .values(status=case(
+                    (ActivityParticipant.user_id.in_(list(present_user_ids)), "attended"),
+                    else_="no_show"
+                ))
+                .execution_options(synchronize_session=False)
+            )
+            # Every row is now one or the other, so count them in the same transaction
+            result = await session.execute(
+                select(ActivityParticipant.status, func.count(ActivityParticipant.id))
+                .where(ActivityParticipant.activity_id == activity_id)
+                .group_by(ActivityParticipant.status)
+            )
+            counts = dict(result.all())
+            await session.commit()
+            return counts.get("attended", 0), counts.get("no_show", 0)
@@ -0,0 +1,142 @@
+import logging
+from database.database import AsyncSessionLocal
+from database.models import Job
+from sqlalchemy.future import select
+from sqlalchemy import delete, func, update
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime, timedelta
+
+class JobService:
+    @staticmethod
+    async def enqueue(kind: str, payload: dict = None, dedupe_key: str = None, run_at: datetime = None, max_attempts: int = 5):
+        """Queue a job for worker.py; returns None if an identical job is already pending"""
+        async with AsyncSessionLocal() as session:
+            job = Job(
+                kind=kind,
+                payload=payload or {},
+                dedupe_key=dedupe_key,
+                run_at=run_at or datetime.utcnow(),
+                max_attempts=max_attempts
+            )
+            session.add(job)
+            try:
+                await session.commit()
+            except IntegrityError:
+                await session.rollback()
+                return None
+            return job
+
+    @staticmethod
+    async def claim(worker_id: str, limit: int = 1):
+        """Lock up to `limit` due jobs for this worker.
+
+        FOR UPDATE SKIP LOCKED lets any number of workers poll the same
+        table without handing out a job twice or waiting on each other.
+        """
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                select(Job)
+                .where(Job.status == "pending", Job.run_at <= datetime.utcnow())
+                .order_by(Job.run_at, Job.id)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+            )
+            jobs = result.scalars().all()
+            now = datetime.utcnow()
+            for job in jobs:
+                job.status = "running"
+                job.locked_at = now
+                job.locked_by = worker_id
+                job.attempts += 1
+            await session.commit()
+            return jobs
+
+    @staticmethod
+    async def complete(job_id: int):
+        async with AsyncSessionLocal() as session:
+            await session.execute(delete(Job).where(Job.id == job_id))
+            await session.commit()
+
+    @staticmethod
+    async def fail(job_id: int, error: str):
+        """Retry with exponential backoff, or park the job as failed once out of attempts"""
+        async with AsyncSessionLocal() as session:
+            job = await session.get(Job, job_id)
+            if not job:
+                return
+            job.last_error = error[:2000]
+            job.locked_at = None
+            job.locked_by = None
+            if job.attempts >= job.max_attempts:
+                job.status = "failed"
+                logging.error(f"Job {job.id} ({job.kind}) failed permanently: {error}")
+            else:
+                job.status = "pending"
+                job.run_at = datetime.utcnow() + timedelta(seconds=2 ** job.attempts)
+            try:
+                await session.commit()
+            except IntegrityError:
+                # An identical job was queued meanwhile; that one will do the work
+                await session.rollback()
+                await session.execute(delete(Job).where(Job.id == job_id))
+                await session.commit()
+
+    @staticmethod
+    async def heartbeat(worker_id: str, job_ids):
+        """Keep this worker's running jobs from looking stale"""
+        async with AsyncSessionLocal() as session:
+            await session.execute(
+                update(Job)
+                .where(Job.id.in_(job_ids), Job.status == "running", Job.locked_by == worker_id)
+                .values(locked_at=datetime.utcnow())
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
+
+    @staticmethod
+    async def requeue_stale(timeout: timedelta):
+        """Release jobs held by workers that died mid-run; returns how many were requeued.
+
+        A job out of attempts is parked as failed instead, so a job that
+        kills its worker isn't retried forever.
+        """
+        cutoff = datetime.utcnow() - timeout
+        stale = (Job.status == "running", Job.locked_at < cutoff)
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                update(Job)
+                .where(*stale, Job.attempts >= Job.max_attempts)
+                .values(status="failed", locked_at=None, locked_by=None, last_error="Worker stopped while running this job")
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount:
+                logging.error(f"{result.rowcount} stale job(s) out of attempts, marked failed")
+
+            # Only one pending job per dedupe_key may exist: drop stale jobs whose
+            # twin is pending again, and all but the oldest of stale twins
+            pending_keys = select(Job.dedupe_key).where(Job.status == "pending", Job.dedupe_key.isnot(None))
+            oldest_stale = (
+                select(func.min(Job.id))
+                .where(*stale, Job.dedupe_key.isnot(None))
+                .group_by(Job.dedupe_key)
+            )
+            await session.execute(
+                delete(Job)
+                .where(*stale, Job.dedupe_key.in_(pending_keys) | Job.id.not_in(oldest_stale))
+                .where(Job.dedupe_key.isnot(None))
+                .execution_options(synchronize_session=False)
+            )
+            try:
+                result = await session.execute(
+                    update(Job)
+                    .where(*stale)
+                    .values(status="pending", locked_at=None, locked_by=None)
+                    .execution_options(synchronize_session=False)
+                )
+                await session.commit()
+            except IntegrityError:
+                # A twin was enqueued after the cleanup above; the next round handles it
+                await session.rollback()
+                logging.warning("Stale job requeue raced an enqueue, retrying next round")
+                return 0
+            return result.rowcount
@@ -0,0 +1,180 @@
+import json
+import logging
+import os
+from database.database import AsyncSessionLocal
+from database.models import Activity, ActivityParticipant
+from sqlalchemy.future import select
+from sqlalchemy import delete, func, update
+from sqlalchemy.orm import selectinload
+from datetime import datetime, timezone
+
+class MaintenanceService:
+    @staticmethod
+    def serialize_activity(activity) -> dict:
+        return {
+            "id": activity.id,
+            "template": activity.template.name if activity.template else None,
+            "scheduled_time": activity.scheduled_time.isoformat() if activity.scheduled_time else None,
+            "duration_minutes": activity.duration_minutes,
+            "location": activity.location,
+            "created_by": activity.created_by,
+            "channel_id": activity.channel_id,
+            "message_id": activity.message_id,
+            "participants": [
+                {
+                    "user_id": p.user_id,
+                    "name": p.user.name if p.user else None,
+                    "role": p.role,
+                    "status": p.status
+                }
+                for p in activity.participants
+            ]
+        }
+
+    @staticmethod
+    def _full_activity_query():
+        return select(Activity).options(
+            selectinload(Activity.template),
+            selectinload(Activity.participants).selectinload(ActivityParticipant.user)
+        )
+
+    @staticmethod
+    async def export_activities(activity_id: int = None, upcoming_only: bool = False):
+        async with AsyncSessionLocal() as session:
+            query = MaintenanceService._full_activity_query().order_by(Activity.id)
+            if activity_id is not None:
+                query = query.where(Activity.id == activity_id)
+            if upcoming_only:
+                query = query.where(Activity.scheduled_time > datetime.now(timezone.utc))
+
+            result = await session.execute(query)
+            return [MaintenanceService.serialize_activity(a) for a in result.scalars().all()]
+
+    @staticmethod
+    async def archive_activities(before: datetime, batch_size: int = 500):
+        """Yield serialized batches of activities scheduled before `before`.
+
+        A batch is deleted only once the caller resumes the generator, so a
+        failed write leaves the rows in place. Its rows stay locked until then
+        and concurrent archivers skip them.
+        """
+        while True:
+            async with AsyncSessionLocal() as session:
+                result = await session.execute(
+                    MaintenanceService._full_activity_query()
+                    .where(Activity.scheduled_time < before)
+                    .order_by(Activity.id)
+                    .limit(batch_size)
+                    .with_for_update(skip_locked=True)
+                )
+                activities = result.scalars().all()
+                if not activities:
+                    return
+
+                yield [MaintenanceService.serialize_activity(a) for a in activities]
+
+                ids = [a.id for a in activities]
+                await session.execute(
+                    delete(ActivityParticipant).where(ActivityParticipant.activity_id.in_(ids))
+                )
+                await session.execute(delete(Activity).where(Activity.id.in_(ids)))
+                await session.commit()
+                logging.info(f"Archived {len(ids)} activities")
+
+    @staticmethod
+    def archived_ids(path: str) -> set:
+        if not os.path.exists(path):
+            return set()
+        with open(path, encoding="utf-8") as f:
+            return {json.loads(line)["id"] for line in f if line.strip()}
+
+    @staticmethod
+    async def write_archive(path: str, before: datetime, batch_size: int = 500) -> int:
+        """Archive activities scheduled before `before` into a JSONL file; returns how many.
+
+        Activities already in the file are deleted without being written
+        again, so a run retried after a crash between write and delete
+        doesn't duplicate records.
+        """
+        done = MaintenanceService.archived_ids(path)
+        total = 0
+        with open(path, "a", encoding="utf-8") as f:
+            async for batch in MaintenanceService.archive_activities(before, batch_size=batch_size):
+                for record in batch:
+                    if record["id"] not in done:
+                        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+                total += len(batch)
+        return total
+
+    @staticmethod
+    async def reconcile_participants(fix: bool = False):
+        """Find roles filled beyond their template capacity; trim the latest signups if `fix`"""
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                select(ActivityParticipant.activity_id, ActivityParticipant.role, func.count(ActivityParticipant.id))
+                .group_by(ActivityParticipant.activity_id, ActivityParticipant.role)
+            )
+            counts = result.all()
+            if not counts:
+                return []
+
+            activity_ids = {activity_id for activity_id, _, _ in counts}
+            result = await session.execute(
+                select(Activity)
+                .where(Activity.id.in_(activity_ids))
+                .options(selectinload(Activity.template))
+            )
+            slot_definitions = {a.id: (a.template.slot_definition if a.template else {}) for a in result.scalars().all()}
+
+            issues = []
+            for activity_id, role, count in counts:
+                slot_def = slot_definitions.get(activity_id, {})
+                if role not in slot_def:
+                    issues.append({"activity_id": activity_id, "role": role, "count": count, "capacity": None, "removed": 0})
+                    continue
+                if slot_def[role].get('unlimited', False):
+                    continue
+
+                capacity = slot_def[role].get('count', 0)
+                if count <= capacity:
+                    continue
+
+                removed = 0
+                if fix:
+                    excess = await session.execute(
+                        select(ActivityParticipant.id)
+                        .where(
+                            ActivityParticipant.activity_id == activity_id,
+                            ActivityParticipant.role == role
+                        )
+                        .order_by(ActivityParticipant.id)
+                        .offset(capacity)
+                    )
+                    excess_ids = excess.scalars().all()
+                    await session.execute(delete(ActivityParticipant).where(ActivityParticipant.id.in_(excess_ids)))
+                    removed = len(excess_ids)
+                issues.append({"activity_id": activity_id, "role": role, "count": count, "capacity": capacity, "removed": removed})
+
+            if fix:
+                await session.commit()
+            return issues
+
+    @staticmethod
+    async def reconcile_counters():
+        """Recompute activities.participant_count where it drifted; returns rows fixed"""
+        async with AsyncSessionLocal() as session:
+            actual = (
+                select(func.count(ActivityParticipant.id))
+                .where(ActivityParticipant.activity_id == Activity.id)
+                .scalar_subquery()
+            )
+            result = await session.execute(
+                update(Activity)
+                .where(Activity.participant_count != actual)
+                .values(participant_count=actual)
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
+            return result.rowcount
@@ -0,0 +1,187 @@
+import logging
+from array import array
+from collections import deque
+from typing import List, Optional, Sequence
+from database.database import AsyncSessionLocal
+from database.models import Activity, ActivityParticipant, User
+from sqlalchemy.future import select
+from sqlalchemy import func, update, case
+from sqlalchemy.orm import selectinload
+from services.activity_service import ActivityService, UNLIMITED_CAPACITY
+
+UNASSIGNED = -1
+
+def role_capacities(slot_definition: dict):
+    """Role names in template order and their capacities as a parallel array"""
+    roles = list(slot_definition.keys())
+    capacities = array("l", (
+        UNLIMITED_CAPACITY if data.get('unlimited', False) else data.get('count', 0)
+        for data in slot_definition.values()
+    ))
+    return roles, capacities
+
+def preference_indices(preferences: Optional[Sequence[str]], role_index: dict) -> List[int]:
+    """Ranked role names -> role indices, dropping roles this template doesn't have"""
+    seen = set()
+    indices = []
+    for role in preferences or []:
+        index = role_index.get(role)
+        if index is not None and index not in seen:
+            seen.add(index)
+            indices.append(index)
+    return indices
+
+def pick_role(capacities: Sequence[int], taken: Sequence[int], preferences: Sequence[int]) -> int:
+    """Best open role for one user: first preference with room, else the first open role"""
+    for index in preferences:
+        if taken[index] < capacities[index]:
+            return index
+    for index in range(len(capacities)):
+        if taken[index] < capacities[index]:
+            return index
+    return UNASSIGNED
+
+def assign_roles(capacities: Sequence[int], preferences: Sequence[Sequence[int]]) -> array:
+    """Assign every user a role from their ranked preference list.
+
+    Users are listed in priority order (signup order). Rank rounds hand out
+    first choices before anyone gets a second choice; whoever is left over
+    is placed with an augmenting path that shifts already-placed users to
+    another role they listed. Every user that can be placed is placed, so
+    if everyone lists the role they currently hold, nobody loses a slot.
+
+    Returns the role index per user, or UNASSIGNED.
+    """
+    role_count = len(capacities)
+    remaining = array("l", capacities)
+    assignment = array("l", [UNASSIGNED]) * len(preferences)
+    holders = [[] for _ in range(role_count)]
+
+    max_rank = max((len(p) for p in preferences), default=0)
+    for rank in range(max_rank):
+        for user, prefs in enumerate(preferences):
+            if assignment[user] != UNASSIGNED or rank >= len(prefs):
+                continue
+            role = prefs[rank]
+            if remaining[role] > 0:
+                remaining[role] -= 1
+                assignment[user] = role
+                holders[role].append(user)
+
+    for user, prefs in enumerate(preferences):
+        if assignment[user] == UNASSIGNED and prefs:
+            _augment(user, preferences, remaining, assignment, holders)
+    return assignment
+
+def _augment(user: int, preferences, remaining, assignment, holders) -> bool:
+    # BFS over roles. came_from[role] = (user who would move into role,
+    # role that user vacates or UNASSIGNED for the user being placed)
+    came_from = {}
+    queue = deque()
+    for role in preferences[user]:
+        if role not in came_from:
+            came_from[role] = (user, UNASSIGNED)
+            queue.append(role)
+
+    while queue:
+        role = queue.popleft()
+        if remaining[role] > 0:
+            remaining[role] -= 1
+            while True:
+                mover, vacated = came_from[role]
+                assignment[mover] = role
+                holders[role].append(mover)
+                if vacated == UNASSIGNED:
+                    return True
+                holders[vacated].remove(mover)
+                role = vacated
+
+        for holder in holders[role]:
+            for next_role in preferences[holder]:
+                if next_role not in came_from:
+                    came_from[next_role] = (holder, role)
+                    queue.append(next_role)
+    return False
+
+class MatchmakingService:
+    @staticmethod
+    async def get_role_counts(session, activity_id: int) -> dict:
+        result = await session.execute(
+            select(ActivityParticipant.role, func.count(ActivityParticipant.id))
+            .where(ActivityParticipant.activity_id == activity_id)
+            .group_by(ActivityParticipant.role)
+        )
+        return dict(result.all())
+
+    @staticmethod
+    async def quick_join(activity_id: int, user_id: int, user_name: str):
+        """Sign a user up for the best open role by their saved preferences"""
+        async with AsyncSessionLocal() as session:
+            activity = await session.get(Activity, activity_id, options=[selectinload(Activity.template)])
+            if not activity:
+                return None, "Activity not found"
+            user = await session.get(User, user_id)
+            counts = await MatchmakingService.get_role_counts(session, activity_id)
+
+        roles, capacities = role_capacities(activity.template.slot_definition)
+        role_index = {role: i for i, role in enumerate(roles)}
+        taken = [counts.get(role, 0) for role in roles]
+        preferences = preference_indices(user.role_preferences if user else None, role_index)
+
+        while True:
+            index = pick_role(capacities, taken, preferences)
+            if index == UNASSIGNED:
+                return None, "Activity is full"
+            participant, error = await ActivityService.add_participant(activity_id, user_id, user_name, roles[index])
+            if participant or error != "Role is full":
+                return participant, error
+            # A concurrent click took the last slot after the counts were read;
+            # every retry rules out one more role, so this ends
+            taken[index] = capacities[index]
+
+    @staticmethod
+    async def rebalance(activity_id: int):
+        """Re-solve role assignments for a whole roster; returns how many changed roles"""
+        async with AsyncSessionLocal() as session:
+            # Row lock held until commit: signups lock the same row, so no one
+            # joins between reading the roster and writing the new roles
+            activity = await session.get(
+                Activity, activity_id, options=[selectinload(Activity.template)], with_for_update=True
+            )
+            if not activity:
+                return None, "Activity not found"
+
+            result = await session.execute(
+                select(ActivityParticipant.id, ActivityParticipant.role, User.role_preferences)
+                .join(User, User.id == ActivityParticipant.user_id)
+                .where(ActivityParticipant.activity_id == activity_id)
+                .order_by(ActivityParticipant.id)
+            )
+            rows = result.all()
+
+            roles, capacities = role_capacities(activity.template.slot_definition)
+            role_index = {role: i for i, role in enumerate(roles)}
+            preferences = []
+            for _, current, saved in rows:
+                prefs = preference_indices(saved, role_index)
+                # The role a user already holds is always acceptable to them
+                if current in role_index and role_index[current] not in prefs:
+                    prefs.append(role_index[current])
+                preferences.append(prefs)
+
+            assignment = assign_roles(capacities, preferences)
+            changes = {
+                participant_id: roles[assignment[i]]
+                for i, (participant_id, current, _) in enumerate(rows)
+                if assignment[i] != UNASSIGNED and roles[assignment[i]] != current
+            }
+            if changes:
+                await session.execute(
+                    update(ActivityParticipant)
+                    .where(ActivityParticipant.id.in_(changes.keys()))
+                    .values(role=case(changes, value=ActivityParticipant.id))
+                    .execution_options(synchronize_session=False)
+                )
+                await session.commit()
+            logging.info(f"Rebalanced activity {activity_id}: {len(changes)} role change(s)")
+            return len(changes), None
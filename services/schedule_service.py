@@ -0,0 +1,218 @@
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from database.database import AsyncSessionLocal
+from database.models import Activity, ActivityParticipant
+from sqlalchemy.future import select
+from sqlalchemy.orm import selectinload
+from config import load_config, MAX_ACTIVITY_MINUTES
+
+INDEX_TTL = 600  # seconds; bounds staleness from signups made by other processes
+INDEX_MAX_USERS = 50_000
+
+def activity_interval(activity):
+    """(start, end) of an activity, using the configured default duration if unset"""
+    minutes = min(activity.duration_minutes or load_config().default_activity_minutes, MAX_ACTIVITY_MINUTES)
+    return activity.scheduled_time, activity.scheduled_time + timedelta(minutes=minutes)
+
+class _Node:
+    __slots__ = ("key", "end", "priority", "left", "right", "max_end")
+
+    def __init__(self, key, end):
+        self.key = key  # (start, activity_id)
+        self.end = end
+        self.priority = random.random()
+        self.left = None
+        self.right = None
+        self.max_end = end
+
+def _update(node):
+    node.max_end = node.end
+    if node.left and node.left.max_end > node.max_end:
+        node.max_end = node.left.max_end
+    if node.right and node.right.max_end > node.max_end:
+        node.max_end = node.right.max_end
+    return node
+
+def _split(node, key):
+    """Split into (keys < key, keys >= key)"""
+    if node is None:
+        return None, None
+    if node.key < key:
+        left, right = _split(node.right, key)
+        node.right = left
+        return _update(node), right
+    left, right = _split(node.left, key)
+    node.left = right
+    return left, _update(node)
+
+def _merge(left, right):
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        return _update(left)
+    right.left = _merge(left, right.left)
+    return _update(right)
+
+def _remove(node, key):
+    if node is None:
+        return None
+    if key == node.key:
+        return _merge(node.left, node.right)
+    if key < node.key:
+        node.left = _remove(node.left, key)
+    else:
+        node.right = _remove(node.right, key)
+    return _update(node)
+
+class IntervalTree:
+    """One user's signups as [start, end) intervals.
+
+    A treap ordered by start and augmented with the largest end in each
+    subtree. Insert and remove are O(log n); an overlap query is
+    O(log n + k) for k matches, because subtrees whose max_end is before
+    the query start, or whose starts are past its end, are skipped.
+    """
+
+    def __init__(self):
+        self.root = None
+        self.starts = {}  # activity_id -> start, to find a node by activity
+
+    def __len__(self):
+        return len(self.starts)
+
+    def add(self, activity_id: int, start: datetime, end: datetime):
+        self.discard(activity_id)
+        key = (start, activity_id)
+        left, right = _split(self.root, key)
+        self.root = _merge(_merge(left, _Node(key, end)), right)
+        self.starts[activity_id] = start
+
+    def discard(self, activity_id: int):
+        start = self.starts.pop(activity_id, None)
+        if start is not None:
+            self.root = _remove(self.root, (start, activity_id))
+
+    def overlapping(self, start: datetime, end: datetime):
+        """(start, end, activity_id) of every interval overlapping [start, end)"""
+        found = []
+        stack = [self.root] if self.root else []
+        while stack:
+            node = stack.pop()
+            if node.max_end <= start:
+                continue
+            node_start, activity_id = node.key
+            if node.left:
+                stack.append(node.left)
+            if node_start < end:
+                if node.end > start:
+                    found.append((node_start, node.end, activity_id))
+                if node.right:
+                    stack.append(node.right)
+        found.sort()
+        return found
+
+    def upcoming(self, after: datetime, limit: int):
+        """First `limit` intervals still running at `after`, in start order"""
+        found = []
+        stack = []
+        node = self.root
+        while (stack or node) and len(found) < limit:
+            while node:
+                if node.max_end <= after:
+                    node = None
+                    break
+                stack.append(node)
+                node = node.left
+            if not stack:
+                break
+            node = stack.pop()
+            if node.end > after:
+                found.append((node.key[0], node.end, node.key[1]))
+            node = node.right
+        return found
+
+class ScheduleService:
+    # user_id -> (IntervalTree, expires_at)
+    _indexes = {}
+
+    @staticmethod
+    def invalidate(user_ids=None):
+        if user_ids is None:
+            ScheduleService._indexes.clear()
+            return
+        for user_id in user_ids:
+            ScheduleService._indexes.pop(user_id, None)
+
+    @staticmethod
+    async def get_index(user_id: int, session=None, refresh: bool = False) -> IntervalTree:
+        """The user's interval index, loaded with one query on a miss.
+
+        Pass the caller's session when it already holds a connection;
+        refresh=True reloads it even on a hit.
+        """
+        cached = ScheduleService._indexes.get(user_id)
+        if cached and cached[1] > time.monotonic() and not refresh:
+            return cached[0]
+
+        # Anything that started within the longest allowed duration may still be running
+        horizon = datetime.now(timezone.utc) - timedelta(minutes=MAX_ACTIVITY_MINUTES)
+        query = (
+            select(Activity)
+            .join(ActivityParticipant, ActivityParticipant.activity_id == Activity.id)
+            .where(ActivityParticipant.user_id == user_id, Activity.scheduled_time > horizon)
+        )
+        if session is not None:
+            activities = (await session.execute(query)).scalars().all()
+        else:
+            async with AsyncSessionLocal() as own_session:
+                activities = (await own_session.execute(query)).scalars().all()
+
+        tree = IntervalTree()
+        for activity in activities:
+            start, end = activity_interval(activity)
+            tree.add(activity.id, start, end)
+        if len(ScheduleService._indexes) >= INDEX_MAX_USERS:
+            ScheduleService._indexes.clear()
+        ScheduleService._indexes[user_id] = (tree, time.monotonic() + INDEX_TTL)
+        return tree
+
+    @staticmethod
+    async def find_conflicts(user_id: int, activity, session=None, refresh: bool = False) -> list:
+        """Signups of this user that overlap `activity`, excluding the activity itself"""
+        start, end = activity_interval(activity)
+        tree = await ScheduleService.get_index(user_id, session, refresh)
+        return [c for c in tree.overlapping(start, end) if c[2] != activity.id]
+
+    @staticmethod
+    def record_signup(user_id: int, activity):
+        cached = ScheduleService._indexes.get(user_id)
+        if cached:
+            start, end = activity_interval(activity)
+            cached[0].add(activity.id, start, end)
+
+    @staticmethod
+    def record_leave(user_id: int, activity_id: int):
+        cached = ScheduleService._indexes.get(user_id)
+        if cached:
+            cached[0].discard(activity_id)
+
+    @staticmethod
+    async def get_schedule(user_id: int, limit: int = 10):
+        """Upcoming (and running) commitments with their activities loaded"""
+        tree = await ScheduleService.get_index(user_id)
+        entries = tree.upcoming(datetime.now(timezone.utc), limit)
+        if not entries:
+            return []
+
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                select(Activity)
+                .where(Activity.id.in_([activity_id for _, _, activity_id in entries]))
+                .options(selectinload(Activity.template))
+            )
+            activities = {a.id: a for a in result.scalars().all()}
+        return [(start, end, activities[activity_id]) for start, end, activity_id in entries if activity_id in activities]
@@ -0,0 +1,164 @@
+import re
+import time
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError, available_timezones
+from database.database import AsyncSessionLocal
+from database.models import User, GuildSettings
+from sqlalchemy.future import select
+
+ZONE_CACHE_TTL = 600  # seconds
+ZONE_CACHE_MAX_ENTRIES = 50_000
+UTC = ZoneInfo("UTC")
+
+WEEKDAYS = {
+    "mon": 0, "monday": 0, "tue": 1, "tuesday": 1, "wed": 2, "wednesday": 2,
+    "thu": 3, "thursday": 3, "fri": 4, "friday": 4, "sat": 5, "saturday": 5,
+    "sun": 6, "sunday": 6
+}
+DATE_FORMATS = ("%Y-%m-%d %H:%M", "%Y-%m-%dT%H:%M", "%d.%m.%Y %H:%M", "%Y-%m-%d %H:%M:%S")
+TIME_PATTERN = re.compile(r"^(\d{1,2})[:.h](\d{2})$")
+RELATIVE_PATTERN = re.compile(r"^in\s+(?:(\d+)\s*h(?:ours?)?)?\s*(?:(\d+)\s*m(?:in(?:utes?)?)?)?$")
+
+@lru_cache(maxsize=None)
+def resolve_zone(name: str) -> ZoneInfo:
+    """Zone name -> ZoneInfo, cached; raises ValueError for unknown names"""
+    try:
+        return ZoneInfo(name.strip())
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Unknown timezone '{name}'. Use an IANA name like Europe/Berlin")
+
+@lru_cache(maxsize=1)
+def zone_names():
+    return tuple(sorted(available_timezones()))
+
+def as_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+def _localize(naive: datetime, zone: ZoneInfo) -> datetime:
+    local = naive.replace(tzinfo=zone)
+    # Wall times skipped by a DST jump don't survive a round trip
+    if local.astimezone(timezone.utc).astimezone(zone).replace(tzinfo=None) != naive:
+        raise ValueError(f"{naive:%Y-%m-%d %H:%M} doesn't exist in {zone.key} (daylight saving change)")
+    return local.astimezone(timezone.utc)
+
+def parse_time(text: str, zone: ZoneInfo, now: datetime = None) -> datetime:
+    """Parse user input as wall time in `zone` and return an aware UTC datetime.
+
+    Accepts "2024-12-31 20:00", "20:00", "today 20:00", "tomorrow 20:00",
+    "fri 19:30" and "in 2h30m". A trailing zone name ("... Europe/Berlin",
+    "... UTC") overrides `zone`.
+    """
+    words = text.strip().split()
+    if len(words) > 1 and ("/" in words[-1] or words[-1].upper() == "UTC"):
+        zone = resolve_zone("UTC" if words[-1].upper() == "UTC" else words[-1])
+        words = words[:-1]
+    phrase = " ".join(words).lower()
+
+    now = as_utc(now or datetime.now(timezone.utc))
+    local_now = now.astimezone(zone).replace(tzinfo=None)
+
+    relative = RELATIVE_PATTERN.match(phrase)
+    if relative and any(relative.groups()):
+        hours, minutes = (int(g or 0) for g in relative.groups())
+        return now + timedelta(hours=hours, minutes=minutes)
+
+    for fmt in DATE_FORMATS:
+        try:
+            return _localize(datetime.strptime(phrase, fmt), zone)
+        except ValueError as e:
+            if "doesn't exist" in str(e):
+                raise
+
+    day_word, _, clock = phrase.rpartition(" ")
+    match = TIME_PATTERN.match(clock)
+    if not match:
+        raise ValueError(f"Couldn't read '{text}'. Try YYYY-MM-DD HH:MM, tomorrow 20:00 or fri 19:30")
+    hour, minute = int(match.group(1)), int(match.group(2))
+    if hour > 23 or minute > 59:
+        raise ValueError(f"Invalid time '{clock}'")
+
+    candidate = local_now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if day_word in ("", "today", "tonight"):
+        if not day_word and candidate <= local_now:
+            candidate += timedelta(days=1)
+    elif day_word == "tomorrow":
+        candidate += timedelta(days=1)
+    elif day_word in WEEKDAYS:
+        days_ahead = (WEEKDAYS[day_word] - local_now.weekday()) % 7
+        candidate += timedelta(days=days_ahead)
+        if candidate <= local_now:
+            candidate += timedelta(days=7)
+    else:
+        raise ValueError(f"Couldn't read '{text}'. Try YYYY-MM-DD HH:MM, tomorrow 20:00 or fri 19:30")
+
+    return _localize(candidate, zone)
+
+class TimezoneService:
+    # (user_id, guild_id) -> (zone, expires_at); zone lookups cost no query on a hit
+    _zone_cache = {}
+
+    @staticmethod
+    def invalidate(user_id: int = None, guild_id: int = None):
+        for key in list(TimezoneService._zone_cache):
+            if (user_id is not None and key[0] == user_id) or (guild_id is not None and key[1] == guild_id):
+                del TimezoneService._zone_cache[key]
+
+    @staticmethod
+    async def get_zone(user_id: int, guild_id: int = None) -> ZoneInfo:
+        """The user's zone, else the server's, else UTC"""
+        key = (user_id, guild_id)
+        cached = TimezoneService._zone_cache.get(key)
+        if cached and cached[1] > time.monotonic():
+            return cached[0]
+
+        async with AsyncSessionLocal() as session:
+            # Both settings in one round trip
+            result = await session.execute(
+                select(
+                    select(User.timezone).where(User.id == user_id).scalar_subquery(),
+                    select(GuildSettings.timezone).where(GuildSettings.guild_id == guild_id).scalar_subquery()
+                )
+            )
+            user_zone, guild_zone = result.one()
+
+        zone = UTC
+        for name in (user_zone, guild_zone):
+            if name:
+                try:
+                    zone = resolve_zone(name)
+                    break
+                except ValueError:
+                    continue
+        if len(TimezoneService._zone_cache) >= ZONE_CACHE_MAX_ENTRIES:
+            TimezoneService._zone_cache.clear()
+        TimezoneService._zone_cache[key] = (zone, time.monotonic() + ZONE_CACHE_TTL)
+        return zone
+
+    @staticmethod
+    async def set_user_timezone(user_id: int, user_name: str, zone_name: str) -> ZoneInfo:
+        zone = resolve_zone(zone_name)
+        async with AsyncSessionLocal() as session:
+            user = await session.get(User, user_id)
+            if not user:
+                user = User(id=user_id, name=user_name)
+                session.add(user)
+            user.timezone = zone.key
+            await session.commit()
+        TimezoneService.invalidate(user_id=user_id)
+        return zone
+
+    @staticmethod
+    async def set_guild_timezone(guild_id: int, zone_name: str) -> ZoneInfo:
+        zone = resolve_zone(zone_name)
+        async with AsyncSessionLocal() as session:
+            settings = await session.get(GuildSettings, guild_id)
+            if not settings:
+                settings = GuildSettings(guild_id=guild_id)
+                session.add(settings)
+            settings.timezone = zone.key
+            await session.commit()
+        TimezoneService.invalidate(guild_id=guild_id)
+        return zone
@@ -31,4 +31,16 @@ class UserService:
     async def get_user(user_id: int):
         async with AsyncSessionLocal() as session:
             result = await session.execute(select(User).where(User.id == user_id))
-            return result.scalars().first()
\ No newline at end of file
+            return result.scalars().first()
+    
+    @staticmethod
+    async def set_role_preferences(user_id: int, user_name: str, roles: list):
+        async with AsyncSessionLocal() as session:
+            user = await session.get(User, user_id)
+            if not user:
+                user = User(id=user_id, name=user_name)
+                session.add(user)
+            user.name = user_name
+            user.role_preferences = roles
+            await session.commit()
+            return user
@@ -0,0 +1,19 @@
+import asyncio
+import pytest
+from database.database import configure_database, dispose_engine, init_db
+from services.schedule_service import ScheduleService
+
+@pytest.fixture
+def run_db(tmp_path):
+    """Run an async test body against a fresh, migrated SQLite database"""
+    def run(body):
+        async def main():
+            configure_database(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+            ScheduleService.invalidate()
+            try:
+                await init_db()
+                return await body()
+            finally:
+                await dispose_engine()
+        return asyncio.run(main())
+    return run
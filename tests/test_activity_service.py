@@ -0,0 +1,185 @@
+import asyncio
+from sqlalchemy import insert
+from benchmarks.signup_storm import seed_activity, fetch_roster
+from database.database import AsyncSessionLocal
+from database.models import Activity, ActivityParticipant
+from services.activity_service import ActivityService
+from services.schedule_service import ScheduleService
+from services.user_service import UserService
+
+def test_add_participant_reports_lost_unique_race(run_db, monkeypatch):
+    async def body():
+        activity, _ = await seed_activity()
+
+        # Land the same user's row after the "already participating" check,
+        # as a concurrent double-click would
+        async def racing_insert(user_id, activity, session=None, refresh=False):
+            await session.execute(
+                insert(ActivityParticipant).values(activity_id=activity.id, user_id=user_id, role="DPS")
+            )
+            return []
+        monkeypatch.setattr(ScheduleService, "find_conflicts", racing_insert)
+
+        result = await ActivityService.add_participant(activity.id, 42, "racer", "Tank")
+        async with AsyncSessionLocal() as session:
+            counter = (await session.get(Activity, activity.id)).participant_count
+        return result, counter, await fetch_roster(activity.id)
+
+    (participant, error), counter, roster = run_db(body)
+    assert participant is None
+    assert error == "Already participating"
+    assert counter == 0
+    assert roster == []
+
+def test_mark_attendance_counts_only_the_roster(run_db):
+    async def body():
+        activity, _ = await seed_activity()
+        for user_id, role in ((1, "Tank"), (2, "DPS"), (3, "DPS")):
+            await ActivityService.add_participant(activity.id, user_id, f"user-{user_id}", role)
+        # User 99 isn't signed up and must not count as present
+        return await ActivityService.mark_attendance(activity.id, [1, 99])
+
+    assert run_db(body) == (1, 2)
+
+def test_created_activity_renders_without_a_session(run_db):
+    from embeds import create_activity_embed
+
+    async def body():
+        activity, _ = await seed_activity()
+        # The session is closed by now; the embed must not lazy-load anything
+        return await create_activity_embed(activity)
+
+    embed = run_db(body)
+    assert embed.fields[0].name.endswith("Tank (0/2)")
+    assert embed.fields[1].name.endswith("Healer (0/4)")
+
+def test_remove_participant_skips_the_counter_when_the_row_is_gone(run_db):
+    from sqlalchemy import event
+    from database.database import get_engine
+
+    async def body():
+        activity, _ = await seed_activity()
+        await ActivityService.add_participant(activity.id, 42, "leaver", "Tank")
+
+        # A concurrent leave deletes the row between our SELECT and DELETE
+        def concurrent_leave(conn, cursor, statement, parameters, context, executemany):
+            if statement.startswith("DELETE FROM activity_participants"):
+                cursor.execute("DELETE FROM activity_participants WHERE user_id = 42")
+        event.listen(get_engine().sync_engine, "before_cursor_execute", concurrent_leave)
+        try:
+            result = await ActivityService.remove_participant(activity.id, 42)
+        finally:
+            event.remove(get_engine().sync_engine, "before_cursor_execute", concurrent_leave)
+        async with AsyncSessionLocal() as session:
+            counter = (await session.get(Activity, activity.id)).participant_count
+        return result, counter
+
+    result, counter = run_db(body)
+    assert result is None
+    # The other leave would have decremented; this one must not decrement again
+    assert counter == 1
+
+SMALL_SLOTS = {
+    "Tank": {"count": 1, "unlimited": False, "emoji": None},
+    "Healer": {"count": 2, "unlimited": False, "emoji": None},
+    "DPS": {"count": 10, "unlimited": True, "emoji": None}
+}
+
+async def seed_pair():
+    """A source roster and a target that already has a tank and user 5"""
+    source, _ = await seed_activity()
+    target, _ = await seed_activity(SMALL_SLOTS)
+    for user_id, role in ((1, "Tank"), (2, "Tank"), (3, "Healer"), (4, "Healer"), (5, "DPS"), (6, "Support"), (7, "DPS"), (8, "DPS")):
+        await ActivityService.add_participant(source.id, user_id, f"user-{user_id}", role, conflict_mode="off")
+    await ActivityService.add_participant(target.id, 99, "user-99", "Tank", conflict_mode="off")
+    await ActivityService.add_participant(target.id, 5, "user-5", "Healer", conflict_mode="off")
+    # User 7 didn't show up last time
+    await ActivityService.mark_attendance(source.id, [1, 2, 3, 4, 5, 6, 8])
+    return source, target
+
+async def roster_and_count(activity_id):
+    async with AsyncSessionLocal() as session:
+        counter = (await session.get(Activity, activity_id)).participant_count
+    return sorted(await fetch_roster(activity_id)), counter
+
+def test_copy_roster_respects_capacity_and_skips_existing_and_no_shows(run_db):
+    async def body():
+        source, target = await seed_pair()
+        copied, error = await ActivityService.copy_roster(source.id, target.id)
+        return copied, error, await roster_and_count(target.id), await roster_and_count(source.id)
+
+    copied, error, (target_rows, target_count), (source_rows, source_count) = run_db(body)
+    assert error is None
+    # Tank is already full, one Healer slot is left for the earlier signup,
+    # DPS is unlimited, user 5 is already in, Support doesn't exist in the
+    # target and user 7 was a no-show
+    assert copied == 2
+    assert target_rows == [(3, "Healer"), (5, "Healer"), (8, "DPS"), (99, "Tank")]
+    assert target_count == 4
+    assert len(source_rows) == source_count == 8
+
+def test_move_participants_moves_only_what_fits(run_db):
+    async def body():
+        source, target = await seed_pair()
+        moved, error = await ActivityService.move_participants(source.id, target.id)
+        return moved, error, await roster_and_count(target.id), await roster_and_count(source.id)
+
+    moved, error, (target_rows, target_count), (source_rows, source_count) = run_db(body)
+    assert error is None
+    assert moved == 2
+    assert target_rows == [(3, "Healer"), (5, "Healer"), (8, "DPS"), (99, "Tank")]
+    assert target_count == 4
+    assert source_rows == [(1, "Tank"), (2, "Tank"), (4, "Healer"), (5, "DPS"), (6, "Support"), (7, "DPS")]
+    assert source_count == 6
+
+def test_move_participants_limited_to_mentioned_users(run_db):
+    async def body():
+        source, target = await seed_pair()
+        moved, _ = await ActivityService.move_participants(source.id, target.id, user_ids=[4, 6, 7])
+        return moved, await roster_and_count(target.id)
+
+    moved, (target_rows, target_count) = run_db(body)
+    # 4 takes the free Healer slot; 6's role doesn't exist there and 7 was a no-show
+    assert moved == 1
+    assert target_rows == [(4, "Healer"), (5, "Healer"), (99, "Tank")]
+    assert target_count == 3
+
+def test_copy_roster_to_a_missing_activity(run_db):
+    async def body():
+        source, _ = await seed_activity()
+        return await ActivityService.copy_roster(source.id, 12345)
+
+    assert run_db(body) == (None, "Activity not found")
+
+async def seed_overlapping_pair():
+    first, _ = await seed_activity()
+    second, _ = await seed_activity()
+    return first, second
+
+def test_reject_mode_sees_signups_the_cached_index_missed(run_db):
+    async def body():
+        first, second = await seed_overlapping_pair()
+        # Cache the user's (empty) schedule, then sign them up elsewhere the
+        # way another process would, without touching this process's cache
+        await ScheduleService.get_index(7)
+        await UserService.get_or_create_user(7, "double-booker")
+        async with AsyncSessionLocal() as session:
+            await session.execute(insert(ActivityParticipant).values(activity_id=first.id, user_id=7, role="DPS"))
+            await session.commit()
+        return await ActivityService.add_participant(second.id, 7, "double-booker", "DPS", conflict_mode="reject")
+
+    participant, error = run_db(body)
+    assert participant is None
+    assert "overlapping" in error
+
+def test_reject_mode_admits_one_of_two_concurrent_overlapping_signups(run_db):
+    async def body():
+        first, second = await seed_overlapping_pair()
+        await ScheduleService.get_index(7)
+        return await asyncio.gather(*(
+            ActivityService.add_participant(activity.id, 7, "double-booker", "DPS", conflict_mode="reject")
+            for activity in (first, second)
+        ))
+
+    results = run_db(body)
+    assert sum(1 for participant, _ in results if participant) == 1
@@ -0,0 +1,138 @@
+from datetime import datetime, timedelta
+from sqlalchemy import update
+from sqlalchemy.future import select
+from database.database import AsyncSessionLocal
+from database.models import Job
+from services.job_service import JobService
+
+TIMEOUT = timedelta(minutes=5)
+
+async def all_jobs():
+    async with AsyncSessionLocal() as session:
+        return (await session.execute(select(Job).order_by(Job.id))).scalars().all()
+
+async def age_locks(job_ids, by=TIMEOUT * 2):
+    """Make running jobs look like their worker died `by` ago"""
+    async with AsyncSessionLocal() as session:
+        await session.execute(update(Job).where(Job.id.in_(job_ids)).values(locked_at=datetime.utcnow() - by))
+        await session.commit()
+
+def test_enqueue_collapses_pending_jobs_with_the_same_key(run_db):
+    async def body():
+        first = await JobService.enqueue("render_activity", {"activity_id": 1}, dedupe_key="render:1")
+        duplicate = await JobService.enqueue("render_activity", {"activity_id": 1}, dedupe_key="render:1")
+        other = await JobService.enqueue("render_activity", {"activity_id": 2}, dedupe_key="render:2")
+        # Once claimed, the next click may queue a fresh re-render
+        await JobService.claim("w1", limit=1)
+        after_claim = await JobService.enqueue("render_activity", {"activity_id": 1}, dedupe_key="render:1")
+        return first, duplicate, other, after_claim
+
+    first, duplicate, other, after_claim = run_db(body)
+    assert first is not None and other is not None and after_claim is not None
+    assert duplicate is None
+
+def test_claim_takes_due_jobs_once(run_db):
+    async def body():
+        due = [await JobService.enqueue("send_reminder", {"n": i}) for i in range(3)]
+        await JobService.enqueue("send_reminder", run_at=datetime.utcnow() + timedelta(hours=1))
+        first = await JobService.claim("w1", limit=2)
+        second = await JobService.claim("w2", limit=5)
+        third = await JobService.claim("w3", limit=5)
+        return [j.id for j in due], first, second, third
+
+    due_ids, first, second, third = run_db(body)
+    assert [j.id for j in first] == due_ids[:2]
+    assert [j.id for j in second] == due_ids[2:]
+    assert third == []
+    assert all(j.status == "running" and j.attempts == 1 and j.locked_by == "w1" for j in first)
+
+def test_fail_backs_off_then_fails_permanently(run_db):
+    async def body():
+        job = await JobService.enqueue("export_activity", max_attempts=2)
+        await JobService.claim("w1")
+        await JobService.fail(job.id, "boom")
+        retried = (await all_jobs())[0]
+        async with AsyncSessionLocal() as session:
+            await session.execute(update(Job).values(run_at=datetime.utcnow()))
+            await session.commit()
+        await JobService.claim("w1")
+        await JobService.fail(job.id, "boom again")
+        return retried, (await all_jobs())[0]
+
+    retried, failed = run_db(body)
+    assert retried.status == "pending" and retried.locked_by is None
+    assert retried.run_at > datetime.utcnow() + timedelta(seconds=1)
+    assert failed.status == "failed" and failed.attempts == 2
+    assert failed.last_error == "boom again"
+
+def test_fail_drops_a_job_whose_twin_is_pending(run_db):
+    async def body():
+        job = await JobService.enqueue("render_activity", dedupe_key="render:1")
+        await JobService.claim("w1")
+        twin = await JobService.enqueue("render_activity", dedupe_key="render:1")
+        await JobService.fail(job.id, "boom")
+        return twin.id, await all_jobs()
+
+    twin_id, jobs = run_db(body)
+    assert [(j.id, j.status) for j in jobs] == [(twin_id, "pending")]
+
+def test_requeue_stale_releases_only_dead_workers_jobs(run_db):
+    async def body():
+        dead = await JobService.enqueue("send_reminder")
+        await JobService.claim("dead-worker")
+        alive = await JobService.enqueue("send_reminder")
+        await JobService.claim("w1")
+        await age_locks([dead.id, alive.id])
+        # The live worker's heartbeat re-stamps its job
+        await JobService.heartbeat("w1", [dead.id, alive.id])
+        requeued = await JobService.requeue_stale(TIMEOUT)
+        return requeued, {j.id: j.status for j in await all_jobs()}, dead.id, alive.id
+
+    requeued, statuses, dead_id, alive_id = run_db(body)
+    assert requeued == 1
+    assert statuses == {dead_id: "pending", alive_id: "running"}
+
+def test_requeue_stale_keeps_one_of_several_jobs_with_a_key(run_db):
+    async def body():
+        # A render is claimed, a second click's re-render is claimed while the
+        # first still runs, then the worker dies holding both
+        first = await JobService.enqueue("render_activity", dedupe_key="render:1")
+        await JobService.claim("w1")
+        second = await JobService.enqueue("render_activity", dedupe_key="render:1")
+        await JobService.claim("w1")
+        reminder = await JobService.enqueue("send_reminder")
+        await JobService.claim("w1")
+        await age_locks([first.id, second.id, reminder.id])
+
+        requeued = await JobService.requeue_stale(TIMEOUT)
+        return requeued, [(j.id, j.status) for j in await all_jobs()], first.id, reminder.id
+
+    requeued, jobs, first_id, reminder_id = run_db(body)
+    assert requeued == 2
+    assert jobs == [(first_id, "pending"), (reminder_id, "pending")]
+
+def test_requeue_stale_drops_a_job_whose_twin_is_pending(run_db):
+    async def body():
+        stale = await JobService.enqueue("render_activity", dedupe_key="render:1")
+        await JobService.claim("w1")
+        twin = await JobService.enqueue("render_activity", dedupe_key="render:1")
+        await age_locks([stale.id])
+        requeued = await JobService.requeue_stale(TIMEOUT)
+        return requeued, [(j.id, j.status) for j in await all_jobs()], twin.id
+
+    requeued, jobs, twin_id = run_db(body)
+    assert requeued == 0
+    assert jobs == [(twin_id, "pending")]
+
+def test_requeue_stale_fails_jobs_out_of_attempts(run_db):
+    async def body():
+        job = await JobService.enqueue("archive_activities", max_attempts=1)
+        await JobService.claim("w1")
+        await age_locks([job.id])
+        requeued = await JobService.requeue_stale(TIMEOUT)
+        return requeued, (await all_jobs())[0]
+
+    requeued, job = run_db(body)
+    assert requeued == 0
+    assert job.status == "failed" and job.locked_by is None
+    assert job.last_error
@@ -0,0 +1,35 @@
+import json
+from datetime import datetime, timedelta, timezone
+from benchmarks.signup_storm import seed_activity
+from database.database import AsyncSessionLocal
+from database.models import Activity
+from services.maintenance_service import MaintenanceService
+from sqlalchemy import func, update
+from sqlalchemy.future import select
+
+def test_write_archive_skips_records_already_written(run_db, tmp_path):
+    path = tmp_path / "archive.jsonl"
+
+    async def body():
+        first, _ = await seed_activity()
+        second, _ = await seed_activity()
+        async with AsyncSessionLocal() as session:
+            await session.execute(
+                update(Activity).values(scheduled_time=datetime.now(timezone.utc) - timedelta(days=60))
+            )
+            await session.commit()
+
+        # A previous run wrote `first` and died before deleting it
+        records = await MaintenanceService.export_activities(activity_id=first.id)
+        path.write_text(json.dumps(records[0]) + "\n", encoding="utf-8")
+
+        total = await MaintenanceService.write_archive(str(path), datetime.now(timezone.utc) - timedelta(days=30))
+        async with AsyncSessionLocal() as session:
+            remaining = (await session.execute(select(func.count(Activity.id)))).scalar()
+        return total, remaining, {first.id, second.id}
+
+    total, remaining, ids = run_db(body)
+    written = [json.loads(line)["id"] for line in path.read_text(encoding="utf-8").splitlines()]
+    assert total == 2
+    assert remaining == 0
+    assert sorted(written) == sorted(ids)
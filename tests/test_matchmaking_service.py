@@ -0,0 +1,87 @@
+import itertools
+import random
+from benchmarks.signup_storm import seed_activity
+from services.activity_service import ActivityService
+from services.matchmaking_service import UNASSIGNED, MatchmakingService, assign_roles, pick_role
+from services.user_service import UserService
+
+def check_assignment(capacities, preferences, assignment):
+    taken = [0] * len(capacities)
+    for prefs, role in zip(preferences, assignment):
+        if role != UNASSIGNED:
+            assert role in prefs
+            taken[role] += 1
+    assert all(t <= c for t, c in zip(taken, capacities))
+
+def placed(assignment):
+    return sum(1 for role in assignment if role != UNASSIGNED)
+
+def brute_max_placed(capacities, preferences):
+    best = 0
+    for choice in itertools.product(*[list(prefs) + [UNASSIGNED] for prefs in preferences]):
+        taken = [0] * len(capacities)
+        for role in choice:
+            if role != UNASSIGNED:
+                taken[role] += 1
+        if all(t <= c for t, c in zip(taken, capacities)):
+            best = max(best, placed(choice))
+    return best
+
+def test_assign_roles_places_as_many_users_as_possible():
+    rng = random.Random(3)
+    for _ in range(300):
+        role_count = rng.randrange(1, 5)
+        capacities = [rng.randrange(0, 3) for _ in range(role_count)]
+        preferences = [
+            rng.sample(range(role_count), rng.randrange(0, role_count + 1))
+            for _ in range(rng.randrange(0, 8))
+        ]
+        assignment = assign_roles(capacities, preferences)
+        check_assignment(capacities, preferences, assignment)
+        assert placed(assignment) == brute_max_placed(capacities, preferences)
+
+def test_augmenting_path_moves_an_earlier_user():
+    # User 0 grabs Tank in the first round; user 1 can only tank, so user 0
+    # has to move to their second choice
+    capacities = [1, 1]
+    assignment = assign_roles(capacities, [[0, 1], [0]])
+    assert list(assignment) == [1, 0]
+
+def test_first_choices_go_to_earlier_signups():
+    assignment = assign_roles([1, 5], [[0, 1], [0, 1], [0, 1]])
+    assert list(assignment) == [0, 1, 1]
+
+def test_nobody_loses_a_held_role():
+    capacities = [2, 1, 3]
+    held = [0, 2, 1, 0, 2]
+    preferences = [[1, 2, 0], [0, 2], [2, 1], [1, 0], [0, 2]]
+    assignment = assign_roles(capacities, preferences)
+    check_assignment(capacities, preferences, assignment)
+    assert UNASSIGNED not in assignment
+    assert all(role in prefs for role, prefs in zip(held, preferences))
+
+def test_unplaceable_users_stay_unassigned():
+    assert list(assign_roles([1], [[0], [0], []])) == [0, UNASSIGNED, UNASSIGNED]
+    assert list(assign_roles([], [])) == []
+
+def test_pick_role_falls_back_to_any_open_role():
+    assert pick_role([1, 2, 1], [1, 0, 0], [0, 2]) == 2
+    assert pick_role([1, 2, 1], [1, 0, 1], [0, 2]) == 1
+    assert pick_role([1, 1], [1, 1], [0]) == UNASSIGNED
+
+def test_quick_join_moves_on_when_its_pick_fills_up(run_db, monkeypatch):
+    async def body():
+        activity, _ = await seed_activity()
+        for user_id in (1, 2):
+            await ActivityService.add_participant(activity.id, user_id, f"tank-{user_id}", "Tank")
+        await UserService.set_role_preferences(3, "late", ["Tank", "Healer"])
+
+        # Counts read before the two tanks joined, as a concurrent click would see them
+        async def stale_counts(session, activity_id):
+            return {}
+        monkeypatch.setattr(MatchmakingService, "get_role_counts", stale_counts)
+        return await MatchmakingService.quick_join(activity.id, 3, "late")
+
+    participant, error = run_db(body)
+    assert error is None
+    assert participant.role == "Healer"
@@ -0,0 +1,45 @@
+import asyncio
+from sqlalchemy import text
+import database.migrations
+from database.database import build_engine
+from database.migrations import current_version, head_version, migrate
+
+def run_two_processes(url, prepare=None):
+    """migrate() from two engines at once, as a bot and a worker starting together"""
+    async def main():
+        engines = [build_engine(url), build_engine(url)]
+        try:
+            if prepare:
+                await prepare(engines[0])
+            applied = await asyncio.gather(*(migrate(engine) for engine in engines))
+            async with engines[0].connect() as conn:
+                versions = (await conn.execute(text("SELECT version FROM schema_version ORDER BY version"))).scalars().all()
+            return applied, versions, await current_version(engines[0])
+        finally:
+            for engine in engines:
+                await engine.dispose()
+    return asyncio.run(main())
+
+def test_concurrent_migrations_of_a_fresh_database(tmp_path):
+    _, versions, current = run_two_processes(f"sqlite+aiosqlite:///{tmp_path / 'fresh.db'}")
+    assert versions == list(range(1, head_version() + 1))
+    assert current == head_version()
+
+def test_concurrent_upgrades_apply_each_step_once(tmp_path, monkeypatch):
+    async def roll_back_three_steps(engine):
+        await migrate(engine)
+        async with engine.begin() as conn:
+            await conn.execute(text("DELETE FROM schema_version WHERE version > :v"), {"v": head_version() - 3})
+
+        # Both processes read the old version before either applies a step
+        barrier = asyncio.Barrier(2)
+        async def racing_current_version(engine):
+            version = await current_version(engine)
+            await barrier.wait()
+            return version
+        monkeypatch.setattr(database.migrations, "current_version", racing_current_version)
+
+    applied, versions, current = run_two_processes(f"sqlite+aiosqlite:///{tmp_path / 'old.db'}", roll_back_three_steps)
+    assert sum(applied) == 3
+    assert versions == list(range(1, head_version() + 1))
+    assert current == head_version()
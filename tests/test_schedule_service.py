@@ -0,0 +1,54 @@
+import random
+from datetime import datetime, timedelta
+from services.schedule_service import IntervalTree
+
+BASE = datetime(2024, 6, 1, 12, 0)
+
+def random_intervals(rng, count):
+    intervals = {}
+    for activity_id in range(1, count + 1):
+        # Coarse starts so equal starts and touching ends come up often
+        start = BASE + timedelta(minutes=15 * rng.randrange(200))
+        intervals[activity_id] = (start, start + timedelta(minutes=15 * rng.randrange(1, 12)))
+    return intervals
+
+def brute_overlapping(intervals, start, end):
+    return sorted((s, e, i) for i, (s, e) in intervals.items() if s < end and e > start)
+
+def brute_upcoming(intervals, after, limit):
+    # Start order, ties by activity id like the tree's keys
+    running = sorted((s, i, e) for i, (s, e) in intervals.items() if e > after)[:limit]
+    return [(s, e, i) for s, i, e in running]
+
+def test_interval_tree_matches_brute_force():
+    rng = random.Random(7)
+    for _ in range(50):
+        intervals = random_intervals(rng, rng.randrange(0, 60))
+        tree = IntervalTree()
+        for activity_id, (start, end) in intervals.items():
+            tree.add(activity_id, start, end)
+
+        # Re-adding moves an interval; discarding drops it, unknown ids included
+        for activity_id in rng.sample(sorted(intervals), len(intervals) // 4):
+            start = BASE + timedelta(minutes=15 * rng.randrange(200))
+            intervals[activity_id] = (start, start + timedelta(minutes=30))
+            tree.add(activity_id, *intervals[activity_id])
+        for activity_id in rng.sample(sorted(intervals), len(intervals) // 4):
+            del intervals[activity_id]
+            tree.discard(activity_id)
+        tree.discard(10_000)
+        assert len(tree) == len(intervals)
+
+        for _ in range(20):
+            start = BASE + timedelta(minutes=15 * rng.randrange(-10, 220))
+            end = start + timedelta(minutes=15 * rng.randrange(1, 12))
+            assert tree.overlapping(start, end) == brute_overlapping(intervals, start, end)
+            limit = rng.randrange(1, 10)
+            assert tree.upcoming(start, limit) == brute_upcoming(intervals, start, limit)
+
+def test_touching_intervals_do_not_overlap():
+    tree = IntervalTree()
+    tree.add(1, BASE, BASE + timedelta(hours=2))
+    assert tree.overlapping(BASE + timedelta(hours=2), BASE + timedelta(hours=3)) == []
+    assert tree.overlapping(BASE - timedelta(hours=1), BASE) == []
+    assert tree.upcoming(BASE + timedelta(hours=2), 5) == []
@@ -0,0 +1,48 @@
+from datetime import datetime, timezone
+import pytest
+from services.timezone_service import parse_time, resolve_zone
+
+BERLIN = resolve_zone("Europe/Berlin")
+# Friday 2024-06-07, 17:00 UTC / 19:00 in Berlin
+NOW = datetime(2024, 6, 7, 17, 0, tzinfo=timezone.utc)
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+def test_absolute_time_is_read_in_the_given_zone():
+    assert parse_time("2024-12-31 20:00", BERLIN, NOW) == utc(2024, 12, 31, 19, 0)
+    assert parse_time("2024-07-01 20:00", BERLIN, NOW) == utc(2024, 7, 1, 18, 0)
+    assert parse_time("2024-07-01 20:00 UTC", BERLIN, NOW) == utc(2024, 7, 1, 20, 0)
+
+def test_relative_time():
+    assert parse_time("in 90m", BERLIN, NOW) == utc(2024, 6, 7, 18, 30)
+    assert parse_time("in 2h30m", BERLIN, NOW) == utc(2024, 6, 7, 19, 30)
+    assert parse_time("in 1 hour", BERLIN, NOW) == utc(2024, 6, 7, 18, 0)
+
+def test_clock_time_rolls_over_to_tomorrow():
+    assert parse_time("20:00", BERLIN, NOW) == utc(2024, 6, 7, 18, 0)
+    assert parse_time("18:00", BERLIN, NOW) == utc(2024, 6, 8, 16, 0)
+    assert parse_time("tomorrow 18:00", BERLIN, NOW) == utc(2024, 6, 8, 16, 0)
+
+def test_weekday_rolls_over_to_next_week():
+    assert parse_time("fri 19:30", BERLIN, NOW) == utc(2024, 6, 7, 17, 30)
+    assert parse_time("fri 18:30", BERLIN, NOW) == utc(2024, 6, 14, 16, 30)
+    assert parse_time("mon 20:00", BERLIN, NOW) == utc(2024, 6, 10, 18, 0)
+    # Past midnight in Berlin it is already Saturday, though still Friday in UTC
+    late = utc(2024, 6, 7, 23, 30)
+    assert parse_time("friday 19:30", BERLIN, late) == utc(2024, 6, 14, 17, 30)
+    assert parse_time("sat 02:00", BERLIN, late) == utc(2024, 6, 8, 0, 0)
+
+def test_skipped_dst_time_is_rejected():
+    with pytest.raises(ValueError, match="daylight saving"):
+        parse_time("2024-03-31 02:30", BERLIN, NOW)
+    with pytest.raises(ValueError, match="daylight saving"):
+        parse_time("tomorrow 02:30", BERLIN, utc(2024, 3, 30, 12, 0))
+
+def test_repeated_dst_time_takes_the_first_occurrence():
+    assert parse_time("2024-10-27 02:30", BERLIN, NOW) == utc(2024, 10, 27, 0, 30)
+
+def test_unreadable_input():
+    for text in ("someday 20:00", "25:00", "tomorrow", "in soon"):
+        with pytest.raises(ValueError):
+            parse_time(text, BERLIN, NOW)
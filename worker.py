@@ -0,0 +1,184 @@
+"""Background job runner: python worker.py
+
+With JOB_QUEUE_ENABLED=true the gateway process (bot.py) only acknowledges
+interactions and queues the heavy work in the `jobs` table. Any number of
+these workers can run alongside it; they claim jobs with
+SELECT ... FOR UPDATE SKIP LOCKED and talk to Discord over REST only,
+without opening a gateway connection.
+"""
+import asyncio
+import logging
+import os
+import socket
+from datetime import datetime, timedelta, timezone
+import discord
+from config import load_config, validate_config
+from database.database import init_db, dispose_engine
+from services.activity_service import ActivityService
+from services.job_service import JobService
+from services.maintenance_service import MaintenanceService
+from embeds import create_activity_embed, create_export_file, create_reminder_message
+
+STALE_JOB_TIMEOUT = timedelta(minutes=5)
+# Running jobs are re-stamped this often, so only a dead worker's jobs go stale
+HEARTBEAT_INTERVAL = STALE_JOB_TIMEOUT / 5
+MAX_POLL_BACKOFF = 60.0  # seconds
+
+# ======================
+# JOB HANDLERS
+# ======================
+
+async def render_activity(client: discord.Client, payload: dict):
+    activity = await ActivityService.get_activity_by_id(payload["activity_id"])
+    # The embed message is posted after the activity row is created
+    if not activity or not activity.channel_id or not activity.message_id:
+        return
+
+    embed = await create_activity_embed(activity)
+    channel = client.get_partial_messageable(activity.channel_id)
+    try:
+        await channel.get_partial_message(activity.message_id).edit(embed=embed)
+    except discord.NotFound:
+        logging.warning(f"Activity {activity.id} message is gone, skipping re-render")
+
+async def send_reminder(client: discord.Client, payload: dict):
+    activity = await ActivityService.get_activity_by_id(payload["activity_id"])
+    if not activity or not activity.channel_id or activity.scheduled_time <= datetime.now(timezone.utc):
+        return
+
+    channel = client.get_partial_messageable(activity.channel_id)
+    await channel.send(create_reminder_message(activity, payload["lead_minutes"]))
+
+async def export_activity(client: discord.Client, payload: dict):
+    if "interaction_token" not in payload:
+        # Queued by an older bot that had the file posted to the whole channel
+        logging.warning(f"Dropping export of activity {payload.get('activity_id')} without an interaction token")
+        return
+
+    records = await MaintenanceService.export_activities(activity_id=payload["activity_id"])
+    # Edit the admin's deferred ephemeral response; the token is valid for 15 minutes
+    response = discord.Webhook.partial(client.application_id, payload["interaction_token"], client=client)
+    try:
+        if not records:
+            await response.edit_message("@original", content=f"❌ Activity `{payload['activity_id']}` not found")
+            return
+        await response.edit_message(
+            "@original",
+            content=f"📤 Export of activity `{payload['activity_id']}`",
+            attachments=[create_export_file(records, payload["activity_id"])]
+        )
+    except discord.NotFound:
+        logging.warning(f"Export of activity {payload['activity_id']} finished after its interaction expired")
+
+async def archive_activities(client: discord.Client, payload: dict):
+    before = datetime.now(timezone.utc) - timedelta(days=payload.get("older_than_days", 30))
+    path = payload.get("path") or load_config().archive_path
+    await MaintenanceService.write_archive(path, before)
+
+HANDLERS = {
+    "render_activity": render_activity,
+    "send_reminder": send_reminder,
+    "export_activity": export_activity,
+    "archive_activities": archive_activities,
+}
+
+# ======================
+# WORKER LOOP
+# ======================
+
+class Worker:
+    def __init__(self, client: discord.Client, concurrency: int, poll_interval: float):
+        self.client = client
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}"
+        self.running = {}  # task -> job id
+
+    async def run_job(self, job):
+        handler = HANDLERS.get(job.kind)
+        if not handler:
+            await JobService.fail(job.id, f"Unknown job kind: {job.kind}")
+            return
+        try:
+            await handler(self.client, job.payload or {})
+            await JobService.complete(job.id)
+        except Exception as e:
+            logging.warning(f"Job {job.id} ({job.kind}) attempt {job.attempts} failed: {e}")
+            try:
+                await JobService.fail(job.id, f"{type(e).__name__}: {e}")
+            except Exception as fail_error:
+                logging.error(f"Couldn't record the failure of job {job.id}, it will be requeued as stale: {fail_error}")
+
+    async def heartbeat(self):
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL.total_seconds())
+            if not self.running:
+                continue
+            try:
+                await JobService.heartbeat(self.worker_id, list(self.running.values()))
+            except Exception as e:
+                logging.warning(f"Heartbeat failed, will retry: {e}")
+
+    async def run(self):
+        logging.info(f"✅ Worker {self.worker_id} started ({self.concurrency} slots)")
+        last_stale_check = datetime.min
+        heartbeat = asyncio.create_task(self.heartbeat())
+        failures = 0
+        try:
+            while True:
+                # A dropped connection or failover must not stop the worker
+                if datetime.utcnow() - last_stale_check > STALE_JOB_TIMEOUT:
+                    last_stale_check = datetime.utcnow()
+                    try:
+                        released = await JobService.requeue_stale(STALE_JOB_TIMEOUT)
+                        if released:
+                            logging.warning(f"Requeued {released} stale job(s)")
+                    except Exception as e:
+                        logging.error(f"Stale job check failed, retrying next round: {e}")
+
+                try:
+                    free = self.concurrency - len(self.running)
+                    jobs = await JobService.claim(self.worker_id, limit=free) if free > 0 else []
+                    failures = 0
+                except Exception as e:
+                    failures += 1
+                    delay = min(MAX_POLL_BACKOFF, self.poll_interval * 2 ** failures)
+                    logging.error(f"Polling failed ({e}), retrying in {delay:.0f}s")
+                    await asyncio.sleep(delay)
+                    continue
+
+                for job in jobs:
+                    task = asyncio.create_task(self.run_job(job))
+                    self.running[task] = job.id
+                    task.add_done_callback(lambda t: self.running.pop(t, None))
+
+                if not jobs:
+                    await asyncio.sleep(self.poll_interval)
+                elif len(self.running) >= self.concurrency:
+                    await asyncio.wait(self.running, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            if self.running:
+                logging.info(f"Waiting for {len(self.running)} running job(s)")
+                await asyncio.gather(*self.running, return_exceptions=True)
+            heartbeat.cancel()
+
+async def main():
+    validate_config()
+    settings = load_config()
+    await init_db()
+
+    # REST-only client: no gateway connection, no intents needed
+    client = discord.Client(intents=discord.Intents.none())
+    await client.login(settings.discord_token)
+    try:
+        await Worker(client, settings.worker_concurrency, settings.worker_poll_interval).run()
+    finally:
+        await client.close()
+        await dispose_engine()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass